@@ -5,25 +5,40 @@ Provides REST API and WebSocket endpoints for task management and real-time upda
 """
 
 import asyncio
+import hashlib
 import json
 import logging
 import uuid
 import os
-import requests
+import random
+import weakref
 import subprocess
+from collections import deque
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Deque, Dict, List, Literal, Optional, Tuple
 from pathlib import Path
 
-from fastapi import FastAPI, WebSocket, HTTPException, BackgroundTasks
+from fastapi import FastAPI, WebSocket, HTTPException, BackgroundTasks, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import uvicorn
-from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+import json_codec
+from llm_cache import TTLCache, conversation_key
+from llm_client import (
+    call_timeout, close_llm_client, create_chat_completion, get_llm_client, llm_flights, llm_governor, stream_chat_deltas
+)
+from llm_governor import INTERACTIVE
+from chat_store import DEFAULT_CONVERSATION_ID, create_chat_store
+from context_builder import DEFAULT_CONTEXT_BUDGET, SUMMARY_MAX_TOKENS, TOKENIZER, ContextBuilder
+from archon_client import CircuitOpenError, close_archon_client, get_archon_client
 from claude_automation import ClaudeCodeAutomation
+from websocket_hub import STATUS_TOPIC, create_event_coalescer, create_websocket_hub
+from task_models import PRIORITY, Task, parse_timestamp, serialize_task
+from task_store import ARCHIVE_BATCH_SIZE, DEFAULT_ARCHIVE_AFTER, create_task_store, decode_cursor, encode_cursor
 
 # Load environment variables
 load_dotenv()
@@ -32,12 +47,18 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client
-openai_client = AsyncOpenAI(
-    api_key=os.getenv("OPENAI_API_KEY")
-)
+# Shared, pooled OpenAI client (also handed to ClaudeCodeAutomation)
+openai_client = get_llm_client()
+# Pooled Archon client, built now so its SSL setup never runs on the event loop
+archon_client = get_archon_client()
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with the fast codec (orjson when available)"""
+    
+    def render(self, content) -> bytes:
+        return json_codec.dumps_bytes(content)
 
-app = FastAPI(title="Claude Code Automation API", version="1.0.0")
+app = FastAPI(title="Claude Code Automation API", version="1.0.0", default_response_class=FastJSONResponse)
 
 # Enable CORS for React frontend
 app.add_middleware(
@@ -49,29 +70,92 @@ app.add_middleware(
 )
 
 # Pydantic models
+# The values the task codebooks know; anything else is rejected with a 422
+TaskStatus = Literal["pending", "in_progress", "completed", "failed"]
+TaskPriority = Literal["critical", "high", "medium", "low"]
+
 class TaskCreate(BaseModel):
     title: str
     description: str
     requirements: List[str] = []
     acceptance_criteria: List[str] = []
-    priority: str = "medium"
+    priority: TaskPriority = "medium"
 
 class TaskUpdate(BaseModel):
-    status: Optional[str] = None
+    status: Optional[TaskStatus] = None
     title: Optional[str] = None
     description: Optional[str] = None
 
+class TaskBulkCreate(BaseModel):
+    tasks: List[TaskCreate]
+
+class TaskBulkUpdateItem(TaskUpdate):
+    id: str
+
+class TaskBulkUpdate(BaseModel):
+    updates: List[TaskBulkUpdateItem]
+
+class TaskBulkDelete(BaseModel):
+    ids: List[str]
+
+# Conversation IDs are chosen by clients (one per browser session), so keep them to a safe shape
+CONVERSATION_ID_PATTERN = r"^[A-Za-z0-9_.:-]{1,128}$"
+
 class ChatMessage(BaseModel):
     content: str
     context: Optional[str] = None
+    conversation_id: str = Field(DEFAULT_CONVERSATION_ID, pattern=CONVERSATION_ID_PATTERN)
 
 class TaskCreationRequest(BaseModel):
     message: str
     context: Optional[str] = None
-
-# In-memory storage (replace with database in production)
-tasks: Dict[str, Dict] = {}
-chat_messages: List[Dict] = []
+    conversation_id: str = Field(DEFAULT_CONVERSATION_ID, pattern=CONVERSATION_ID_PATTERN)
+
+# Task storage (SQLite by default, TASK_STORE_BACKEND=memory for tests)
+task_store = create_task_store()
+DEFAULT_TASK_PAGE_SIZE = 100
+MAX_TASK_PAGE_SIZE = 1000
+MAX_BULK_OPERATIONS = 5000
+DEFAULT_SEARCH_RESULTS = 20
+MAX_SEARCH_RESULTS = 200
+# Completed/failed tasks untouched this long (seconds) move to the archive; 0 disables archiving
+TASK_ARCHIVE_AFTER = float(os.getenv("TASK_ARCHIVE_AFTER", DEFAULT_ARCHIVE_AFTER))
+ARCHIVE_SWEEP_INTERVAL = 300
+# Chat history per conversation: latest messages in memory, the rest in an append-only log
+chat_store = create_chat_store()
+DEFAULT_CHAT_PAGE_SIZE = 50
+MAX_CHAT_PAGE_SIZE = 500
+# Messages of history offered to the chat context builder, which trims them to its token budget
+CHAT_CONTEXT_MESSAGES = 50
+ANALYSIS_CONTEXT_MESSAGES = 6
+# Parsed analyses by conversation window, so retries and repeated windows skip the LLM
+analysis_cache = TTLCache(
+    maxsize=int(os.getenv("ANALYSIS_CACHE_SIZE", 256)),
+    ttl=float(os.getenv("ANALYSIS_CACHE_TTL", 600))
+)
+# Archon replication: tasks are created locally, then copied to Archon from the store's outbox
+REPLICATION_BATCH_SIZE = 20
+# Seconds a claimed outbox entry stays hidden from other workers before it is retried
+REPLICATION_LEASE = 120
+REPLICATION_POLL_INTERVAL = 2
+# Backoff between delivery attempts: 1s doubling up to 5 minutes, with full jitter
+REPLICATION_BASE_DELAY = 1.0
+REPLICATION_MAX_DELAY = 300.0
+REPLICATION_MAX_ATTEMPTS = int(os.getenv("ARCHON_REPLICATION_MAX_ATTEMPTS", 50))
+replication_wakeup = asyncio.Event()
+# One chat turn at a time per conversation; locks of idle conversations are dropped
+conversation_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+# Conversation windows waiting for task analysis: in order within a conversation,
+# in parallel (up to MAX_CONCURRENT_ANALYSES) across conversations
+MAX_PENDING_ANALYSES = 100
+MAX_CONCURRENT_ANALYSES = int(os.getenv("MAX_CONCURRENT_ANALYSES", 4))
+pending_analyses: Dict[str, Deque[Tuple[str, List[Dict]]]] = {}
+analysis_workers: Dict[str, asyncio.Task] = {}
+analysis_slots = asyncio.Semaphore(MAX_CONCURRENT_ANALYSES)
+# Chat prompts: token budget with rolling summaries of older turns
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", DEFAULT_CONTEXT_BUDGET))
+# Push chat replies to clients token by token as they are generated (CHAT_STREAMING=false waits for the full reply)
+CHAT_STREAMING = os.getenv("CHAT_STREAMING", "true").lower() != "false"
 automation_status = {
     "running": False,
     "current_task": None,
@@ -80,49 +164,137 @@ automation_status = {
     "error_count": 0
 }
 
-# WebSocket connections
-websocket_connections: List[WebSocket] = []
+# WebSocket clients, each with a bounded send queue drained by its own writer task
+websocket_hub = create_websocket_hub()
 
 # Automation instance
 automation_instance: Optional[ClaudeCodeAutomation] = None
 automation_task: Optional[asyncio.Task] = None
 
+def coalesce_key(message: Dict) -> Optional[str]:
+    """Key of frames that carry a full state, so a newer one may replace a queued older one"""
+    if message["type"] in ("status_update", "automation_started", "automation_stopped"):
+        return "automation_status"
+    if message["type"] == "task_updated":
+        return f"task:{message['data'].get('id')}"
+    return None
+
+def event_topics(message: Dict) -> List[str]:
+    """Topics an event goes out under to clients that subscribed to topics
+    
+    Every event has its type; task events name their task (and the conversation that
+    proposed it), chat events their conversation, and automation status events "status".
+    A tasks_changed frame goes whole to watchers of any task in it.
+    """
+    event_type = message["type"]
+    data = message.get("data") or {}
+    topics = [f"type:{event_type}"]
+    if event_type in ("status_update", "automation_started", "automation_stopped"):
+        topics.append(STATUS_TOPIC)
+    elif event_type in ("task_created", "task_updated"):
+        topics.append(f"task:{data.get('id')}")
+        if data.get("conversation_id"):
+            topics.append(f"conversation:{data['conversation_id']}")
+    elif event_type == "task_deleted":
+        topics.append(f"task:{data.get('task_id')}")
+    elif event_type == "tasks_changed":
+        for task in data["created"] + data["updated"]:
+            topics.append(f"task:{task['id']}")
+            if task.get("conversation_id"):
+                topics.append(f"conversation:{task['conversation_id']}")
+        topics.extend(f"task:{task_id}" for task_id in data["deleted"] + data["archived"])
+    elif data.get("conversation_id"):
+        # chat_message, chat_delta and chat_analysis
+        topics.append(f"conversation:{data['conversation_id']}")
+    return topics
+
+# Gathers events for WS_COALESCE_WINDOW so a burst reaches clients as one frame,
+# with only the latest state of each task and of the automation status. Streamed reply
+# fragments are neither sequenced nor replayed: the final chat_message carries the text
+event_coalescer = create_event_coalescer(websocket_hub, coalesce_key, event_topics, unsequenced=("chat_delta",))
+
 async def broadcast_message(message: Dict):
-    """Broadcast message to all connected WebSocket clients"""
-    if websocket_connections:
-        disconnected = []
-        for websocket in websocket_connections:
-            try:
-                await websocket.send_text(json.dumps(message))
-            except:
-                disconnected.append(websocket)
-        
-        # Remove disconnected websockets
-        for ws in disconnected:
-            websocket_connections.remove(ws)
+    """Broadcast message to all connected WebSocket clients
+    
+    Only hands the event to the coalescer, so it never waits on a slow client; it goes out
+    with the rest of its window.
+    """
+    event_coalescer.publish(message)
 
 def create_task(task_data: Dict) -> Dict:
     """Create a new task"""
-    task_id = str(uuid.uuid4())
-    now = datetime.now().isoformat()
-    
-    task = {
-        "id": task_id,
-        "title": task_data["title"],
-        "description": task_data["description"],
-        "requirements": task_data.get("requirements", []),
-        "acceptance_criteria": task_data.get("acceptance_criteria", []),
-        "priority": task_data.get("priority", "medium"),
-        "status": "pending",
-        "created_at": now,
-        "updated_at": now
-    }
+    task = task_store.create(Task.new(task_data))
+    return serialize_task(task)
+
+def create_tasks(tasks_data: List[Dict]) -> List[Dict]:
+    """Create several tasks in one store transaction"""
+    with task_store.transaction():
+        return [create_task(task_data) for task_data in tasks_data]
+
+async def broadcast_tasks_changed(
+    created: Optional[List[Dict]] = None,
+    updated: Optional[List[Dict]] = None,
+    deleted: Optional[List[str]] = None,
+    archived: Optional[List[str]] = None
+):
+    """Send one batched frame describing a set of task changes"""
+    await broadcast_message({
+        "type": "tasks_changed",
+        "data": {
+            "created": created or [],
+            "updated": updated or [],
+            "deleted": deleted or [],
+            "archived": archived or [],
+            "version": task_store.version
+        }
+    })
+
+async def stream_chat_completion(message_id: str, conversation_id: str, **request) -> str:
+    """Run a chat completion as a stream, pushing each piece to clients as a chat_delta frame"""
+    parts = []
+    async for delta in stream_chat_deltas(openai_client, INTERACTIVE, **request):
+        parts.append(delta)
+        await broadcast_message({
+            "type": "chat_delta",
+            "data": {"id": message_id, "conversation_id": conversation_id, "delta": delta}
+        })
     
-    tasks[task_id] = task
-    return task
+    return "".join(parts).strip()
 
-async def chat_with_openai(message: str, conversation_history: List[Dict]) -> Dict:
-    """Have a normal conversation with OpenAI GPT-4"""
+async def summarize_conversation(summary: Optional[str], turns: List[Dict]) -> str:
+    """Fold older conversation turns into the running summary"""
+    transcript = "\n".join(f"{turn['type']}: {turn['content']}" for turn in turns)
+    previous = summary or "(no summary yet)"
+    
+    response = await create_chat_completion(
+        openai_client,
+        model="gpt-4",
+        messages=[
+            {"role": "system", "content": "You maintain a concise running summary of a conversation between a user and a software development assistant. Keep decisions, requirements, names and open questions; drop pleasantries. Reply with the updated summary only."},
+            {"role": "user", "content": f"Current summary:\n{previous}\n\nNew messages to fold in:\n{transcript}"}
+        ],
+        temperature=0.2,
+        max_tokens=SUMMARY_MAX_TOKENS,
+        timeout=call_timeout("summary")
+    )
+    return response.choices[0].message.content
+
+context_builder = ContextBuilder(summarize_conversation, budget=CHAT_CONTEXT_TOKENS)
+
+async def chat_with_openai(
+    message: str,
+    conversation_history: List[Dict],
+    message_id: Optional[str] = None,
+    conversation_id: str = DEFAULT_CONVERSATION_ID
+) -> Dict:
+    """Have a normal conversation with OpenAI GPT-4
+    
+    conversation_history is that conversation's history and normally already ends with the
+    user's message; the prompt is built from it by the token-budgeted context builder.
+    
+    With a message_id (and CHAT_STREAMING on) the reply is streamed to clients as
+    chat_delta frames for that message while it is generated.
+    """
     try:
         system_prompt = """You are a helpful software development assistant working within the Claude Code Automation system. You have access to development tools and can help create and manage development tasks.
 
@@ -147,27 +319,26 @@ Examples of how to respond:
 
 Be proactive and assumptive rather than overly cautious."""
 
-        # Build message history for context
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add conversation history (last 10 messages to keep context manageable)
-        for msg in conversation_history[-10:]:
-            if msg["type"] == "user":
-                messages.append({"role": "user", "content": msg["content"]})
-            elif msg["type"] == "assistant":
-                messages.append({"role": "assistant", "content": msg["content"]})
-        
-        # Add current message
-        messages.append({"role": "user", "content": message})
-
-        response = await openai_client.chat.completions.create(
-            model="gpt-4",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=800
-        )
+        # Recent turns verbatim plus a rolling summary of older ones, within the token budget
+        if not conversation_history or conversation_history[-1].get("content") != message:
+            conversation_history = conversation_history + [{"type": "user", "content": message}]
+        messages = context_builder.build(conversation_id, system_prompt, conversation_history)
+
+        request = {
+            "model": "gpt-4",
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": 800,
+            "timeout": call_timeout("chat")
+        }
         
-        assistant_response = response.choices[0].message.content.strip()
+        if message_id is not None and CHAT_STREAMING:
+            # Not single-flighted: turns of a conversation are serialized by its lock, and a
+            # stream is addressed to one message of one conversation, so none could be shared
+            assistant_response = await stream_chat_completion(message_id, conversation_id, **request)
+        else:
+            response = await create_chat_completion(openai_client, INTERACTIVE, **request)
+            assistant_response = response.choices[0].message.content.strip()
         logger.info(f"OpenAI chat response: {assistant_response}")
         
         return {
@@ -223,14 +394,21 @@ Guidelines for task creation:
 - Only skip task creation if the request is truly vague like "help me" or "what can you do?"
 - Be very proactive - err on the side of creating tasks rather than waiting"""
 
-        response = await openai_client.chat.completions.create(
+        cache_key = conversation_key(system_prompt, recent_messages)
+        cached = analysis_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        response = await create_chat_completion(
+            openai_client,
             model="gpt-4",
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": f"Analyze this conversation for task creation:\n\n{conversation_text}"}
             ],
             temperature=0.3,
-            max_tokens=1000
+            max_tokens=1000,
+            timeout=call_timeout("analysis")
         )
         
         analysis_text = response.choices[0].message.content.strip()
@@ -242,89 +420,368 @@ Guidelines for task creation:
             analysis_text = analysis_text[3:-3].strip()
         
         analysis = json.loads(analysis_text)
+        # Only successful analyses are cached; failures fall through to the next attempt
+        analysis_cache.put(cache_key, analysis)
         return analysis
         
     except Exception as e:
         logger.error(f"Error analyzing conversation for tasks: {e}")
         return {"should_create_tasks": False, "reasoning": "Analysis failed", "tasks": []}
 
-async def create_tasks_via_mcp(tasks: List[Dict]) -> List[Dict]:
-    """Create tasks using MCP tools (Archon)"""
+def normalize_priority(priority) -> str:
+    """Map a model-proposed priority onto a known one ("High" -> "high", unknown -> "medium")"""
+    priority = str(priority or "").strip().lower()
+    return priority if priority in PRIORITY else "medium"
+
+def create_tasks_for_replication(tasks: List[Dict], conversation_id: Optional[str] = None) -> List[Dict]:
+    """Create tasks locally and queue them for Archon (MCP) in the same store transaction
+    
+    Returns at local speed whatever Archon's health; the replication worker delivers them.
+    """
+    tasks = [{**task_data, "priority": normalize_priority(task_data.get("priority"))} for task_data in tasks]
+    with task_store.transaction():
+        created_tasks = create_tasks([{**task_data, "conversation_id": conversation_id} for task_data in tasks])
+        for task in created_tasks:
+            task_store.enqueue_replication(task["id"])
+    replication_wakeup.set()
+    return created_tasks
+
+def replication_delay(attempts: int) -> float:
+    """Backoff before the next delivery after attempts failures: exponential with full jitter"""
+    return random.uniform(0, min(REPLICATION_MAX_DELAY, REPLICATION_BASE_DELAY * 2 ** attempts))
+
+def settle_replication(entry_id: int, attempts: int, task: Dict, result) -> Optional[Dict]:
+    """Ack, retry or give up on one outbox entry given Archon's answer; returns the task if it changed"""
+    breaker = archon_client.breaker
+    if isinstance(result, CircuitOpenError):
+        # Never sent, so it does not count as an attempt
+        task_store.retry_replication(entry_id, max(breaker.retry_in(), 1.0), str(result), attempted=False)
+    elif isinstance(result, Exception):
+        error = str(result) or result.__class__.__name__
+        if attempts + 1 >= REPLICATION_MAX_ATTEMPTS:
+            logger.error(f"Giving up replicating task {task['id']} to Archon after {attempts + 1} attempts: {error}")
+            task_store.finish_replication(entry_id)
+        else:
+            task_store.retry_replication(entry_id, replication_delay(attempts + 1), error)
+    else:
+        # Accepted by Archon: ack before anything else can go wrong
+        task_store.finish_replication(entry_id)
+        logger.info(f"Replicated task to Archon: {task['title']}")
+        if isinstance(result, dict) and result.get("id"):
+            updated = task_store.update(task["id"], {"archon_id": result["id"]})
+            if updated is not None:
+                return serialize_task(updated)
+    return None
+
+async def replicate_outbox() -> int:
+    """Deliver one batch of due outbox entries to Archon; returns how many entries were claimed"""
+    breaker = archon_client.breaker
+    if breaker.state == "open":
+        return 0
+    # While half-open, a single entry probes whether Archon is back
+    limit = 1 if breaker.state == "half_open" else REPLICATION_BATCH_SIZE
+    entries = task_store.claim_replications(limit, REPLICATION_LEASE)
+    
+    pending = []
+    for entry_id, task_id, attempts in entries:
+        task = task_store.get(task_id)
+        if task is None:
+            # Deleted before it was replicated
+            task_store.finish_replication(entry_id)
+        else:
+            pending.append((entry_id, attempts, serialize_task(task)))
+    if not pending:
+        return len(entries)
+    
+    results = await archon_client.create_tasks([task for _, _, task in pending])
+    
+    replicated = []
+    for (entry_id, attempts, task), result in zip(pending, results):
+        try:
+            updated = settle_replication(entry_id, attempts, task, result)
+        except Exception as e:
+            # Settled one by one, so an odd response cannot hold back the rest of the batch;
+            # an entry left unsettled is retried when its lease runs out
+            logger.error(f"Error settling replication of task {task['id']}: {e}")
+            continue
+        if updated is not None:
+            replicated.append(updated)
+    
+    if replicated:
+        await broadcast_tasks_changed(updated=replicated)
+    return len(entries)
+
+async def run_replicator():
+    """Background worker that copies outbox entries to Archon, woken early when tasks are queued"""
+    while True:
+        try:
+            claimed = await replicate_outbox()
+        except Exception as e:
+            logger.error(f"Error replicating tasks to Archon: {e}")
+            claimed = 0
+        if claimed >= REPLICATION_BATCH_SIZE:
+            # A full batch; more are probably due
+            continue
+        
+        try:
+            await asyncio.wait_for(replication_wakeup.wait(), REPLICATION_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        replication_wakeup.clear()
+
+async def analyze_and_create_tasks(conversation_id: str, message_id: str, conversation: List[Dict]):
+    """Pipeline stage: analyze a conversation window and create any tasks it calls for"""
+    analysis = await analyze_conversation_for_tasks(conversation)
     created_tasks = []
     
-    try:
-        archon_url = os.getenv("MCP_ARCHON_URL", "http://localhost:8181")
+    if analysis.get("should_create_tasks", False) and analysis.get("tasks"):
+        # Create tasks locally; the outbox worker replicates them to Archon (MCP)
+        created_tasks = create_tasks_for_replication(analysis["tasks"], conversation_id)
         
-        for task_data in tasks:
-            # Try to create task via Archon MCP
+        if created_tasks:
+            # Broadcast all created tasks in one frame
+            await broadcast_tasks_changed(created=created_tasks)
+            
+            # Add a system message about task creation
+            task_creation_message = {
+                "id": str(uuid.uuid4()),
+                "type": "system",
+                "content": f"✅ I've automatically created {len(created_tasks)} task(s) based on our conversation: {', '.join([t['title'] for t in created_tasks])}",
+                "timestamp": datetime.now().isoformat(),
+                "conversation_id": conversation_id
+            }
+            chat_store.history(conversation_id).append(task_creation_message)
+            
+            await broadcast_message({
+                "type": "chat_message",
+                "data": task_creation_message
+            })
+    
+    await broadcast_message({
+        "type": "chat_analysis",
+        "data": {
+            "message_id": message_id,
+            "conversation_id": conversation_id,
+            "should_create_tasks": analysis.get("should_create_tasks", False),
+            "reasoning": analysis.get("reasoning", ""),
+            "tasks_created": len(created_tasks)
+        }
+    })
+
+def pending_analysis_count() -> int:
+    return sum(len(queue) for queue in pending_analyses.values())
+
+def queue_conversation_analysis(conversation_id: str, message_id: str, conversation: List[Dict]):
+    """Hand a conversation window to the analysis pipeline without waiting for it"""
+    if pending_analysis_count() >= MAX_PENDING_ANALYSES:
+        logger.warning(f"Analysis queue full, skipping task analysis for message {message_id}")
+        return
+    
+    queue = pending_analyses.setdefault(conversation_id, deque())
+    queue.append((message_id, conversation))
+    if conversation_id not in analysis_workers:
+        analysis_workers[conversation_id] = asyncio.create_task(run_conversation_analyses(conversation_id, queue))
+
+async def run_conversation_analyses(conversation_id: str, queue: Deque[Tuple[str, List[Dict]]]):
+    """Background worker for one conversation's analyses; windows are analyzed one at a time,
+    in order, and the worker exits once its queue is empty"""
+    try:
+        while queue:
+            message_id, conversation = queue.popleft()
             try:
-                response = requests.post(
-                    f"{archon_url}/projects/tasks",
-                    json={
-                        "title": task_data["title"],
-                        "description": task_data["description"],
-                        "requirements": task_data.get("requirements", []),
-                        "acceptance_criteria": task_data.get("acceptance_criteria", []),
-                        "priority": task_data.get("priority", "medium"),
-                        "status": "pending"
-                    },
-                    timeout=10
-                )
-                
-                if response.status_code == 200:
-                    mcp_task = response.json()
-                    created_tasks.append(mcp_task)
-                    logger.info(f"Created task via MCP: {task_data['title']}")
-                else:
-                    # Fallback to local task creation
-                    local_task = create_task(task_data)
-                    created_tasks.append(local_task)
-                    logger.warning(f"MCP failed, created local task: {task_data['title']}")
-                    
+                async with analysis_slots:
+                    await analyze_and_create_tasks(conversation_id, message_id, conversation)
             except Exception as e:
-                # Fallback to local task creation
-                logger.error(f"MCP task creation failed: {e}")
-                local_task = create_task(task_data)
-                created_tasks.append(local_task)
-        
-        return created_tasks
-        
-    except Exception as e:
-        logger.error(f"Error in MCP task creation: {e}")
-        return []
+                logger.error(f"Error in analysis pipeline: {e}")
+    finally:
+        # Both go in the same step, so a window queued from now on starts a new worker
+        pending_analyses.pop(conversation_id, None)
+        analysis_workers.pop(conversation_id, None)
+
+def conversation_lock(conversation_id: str) -> asyncio.Lock:
+    """The lock that keeps one conversation's turns in order"""
+    lock = conversation_locks.get(conversation_id)
+    if lock is None:
+        lock = conversation_locks[conversation_id] = asyncio.Lock()
+    return lock
 
 # WebSocket endpoint
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(
+    websocket: WebSocket,
+    topics: Optional[str] = None,
+    stream: Optional[str] = None,
+    last_seq: Optional[int] = None
+):
+    """Event stream; every event by default, or only those matching the client's topics
+    
+    Topics ("status", "task:<id>", "type:<event type>", "conversation:<id>") can be given
+    comma-separated in ?topics= or changed later with
+    {"type": "subscribe" | "unsubscribe", "topics": [...]}; unsubscribing without topics
+    (or from the last one) returns to the full stream. Both are answered with a
+    "subscribed" frame listing the current topics.
+    
+    Events carry a "seq". The first frame is a "hello" with the stream ID and the latest
+    seq sent; a client reconnecting with ?stream=<stream ID>&last_seq=<last seq it saw>
+    gets "resumed": true followed by the events it missed, or "resumed": false when they
+    are no longer buffered (or the server restarted) and it has to resynchronize.
+    """
     await websocket.accept()
-    websocket_connections.append(websocket)
+    client = websocket_hub.register(websocket)
     
     try:
-        # Send current status
-        await websocket.send_text(json.dumps({
-            "type": "status_update",
-            "data": automation_status
+        initial_topics = split_filter(topics)
+        if initial_topics:
+            try:
+                websocket_hub.subscribe(client, initial_topics)
+            except ValueError as e:
+                await websocket.send_text(json_codec.dumps({"type": "error", "data": {"message": str(e)}}))
+                await websocket.close(code=1008)
+                return
+        
+        missed = event_coalescer.catch_up(client, stream, last_seq) if last_seq is not None else None
+        client.enqueue(json_codec.dumps({
+            "type": "hello",
+            "data": {
+                "stream_id": event_coalescer.replay.stream_id,
+                "seq": event_coalescer.replay.last_seq,
+                "resumed": missed is not None
+            }
         }))
+        if missed:
+            event_coalescer.send_to(client, missed)
+        
+        # Send current status
+        status_message = {"type": "status_update", "data": automation_status}
+        if client.wants(event_topics(status_message)):
+            client.enqueue(json_codec.dumps(status_message))
         
         while True:
             data = await websocket.receive_text()
-            message = json.loads(data)
+            message = json_codec.loads(data)
             
             # Handle different message types
             if message["type"] == "ping":
-                await websocket.send_text(json.dumps({"type": "pong"}))
+                client.enqueue(json_codec.dumps({"type": "pong"}))
+            elif message["type"] in ("subscribe", "unsubscribe"):
+                requested = message.get("topics")
+                try:
+                    if requested is not None and not isinstance(requested, list):
+                        raise ValueError("topics must be a list")
+                    if message["type"] == "subscribe":
+                        current = websocket_hub.subscribe(client, requested or [])
+                    else:
+                        current = websocket_hub.unsubscribe(client, requested)
+                except (TypeError, ValueError) as e:
+                    client.enqueue(json_codec.dumps({"type": "error", "data": {"message": str(e)}}))
+                    continue
+                client.enqueue(json_codec.dumps({"type": "subscribed", "data": {"topics": sorted(current)}}))
     
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
     finally:
-        if websocket in websocket_connections:
-            websocket_connections.remove(websocket)
+        client.close()
 
 # API Routes
+def split_filter(value: Optional[str]) -> Optional[set]:
+    """Turn a comma-separated query parameter into a set of values"""
+    if not value:
+        return None
+    return {part.strip() for part in value.split(",") if part.strip()}
+
+def query_etag(request: Request, version: int) -> str:
+    """Strong ETag for a query at the given store version"""
+    digest = hashlib.sha1(str(request.query_params).encode()).hexdigest()[:12]
+    return f'"{task_store.epoch}-{version}-{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check whether the client's If-None-Match already names this ETag"""
+    header = request.headers.get("if-none-match", "")
+    return etag in [tag.strip() for tag in header.split(",")]
+
 @app.get("/api/tasks")
-async def get_tasks():
-    """Get all tasks"""
-    return {"tasks": list(tasks.values())}
+async def get_tasks(
+    request: Request,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    updated_after: Optional[str] = None,
+    updated_before: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_TASK_PAGE_SIZE
+):
+    """Get a page of tasks, newest update first, with optional filters"""
+    limit = max(1, min(limit, MAX_TASK_PAGE_SIZE))
+    
+    # The page is fully determined by the store version and the query, so an unchanged
+    # store can answer a conditional poll without touching any task
+    etag = query_etag(request, task_store.current_version())
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    try:
+        cursor_key = decode_cursor(cursor) if cursor else None
+        updated_after_ts = parse_timestamp(updated_after) if updated_after else None
+        updated_before_ts = parse_timestamp(updated_before) if updated_before else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    page, next_key = task_store.query(
+        statuses=split_filter(status),
+        priorities=split_filter(priority),
+        updated_after=updated_after_ts,
+        updated_before=updated_before_ts,
+        cursor=cursor_key,
+        limit=limit
+    )
+    
+    # Returned as a response directly so FastAPI skips its generic jsonable_encoder pass
+    return FastJSONResponse({
+        "tasks": [serialize_task(task) for task in page],
+        "next_cursor": encode_cursor(next_key) if next_key else None,
+        "version": task_store.version,
+        "epoch": task_store.epoch
+    }, headers={"ETag": etag})
+
+@app.get("/api/tasks/changes")
+async def get_task_changes(request: Request, since: int = 0, epoch: Optional[str] = None):
+    """Get tasks changed since a store version, with tombstones for deleted tasks"""
+    etag = query_etag(request, task_store.current_version())
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    # A version from another store (e.g. the database was replaced) cannot be diffed against
+    changes = task_store.changes(since) if epoch in (None, task_store.epoch) else None
+    
+    if changes is None:
+        updated, deleted = [], []
+    else:
+        updated, deleted = changes
+    
+    return FastJSONResponse({
+        "reset": changes is None,
+        "tasks": [serialize_task(task) for task in updated],
+        "deleted": deleted,
+        "version": task_store.version,
+        "epoch": task_store.epoch
+    }, headers={"ETag": etag})
+
+@app.get("/api/tasks/search")
+def search_tasks(q: str, limit: int = DEFAULT_SEARCH_RESULTS):
+    """Full-text search over task titles, descriptions, requirements and implementation output
+    
+    A plain def, so it runs in the threadpool: if the index is not built yet (startup
+    still building it, or the store was reloaded) this request waits, not the event loop.
+    """
+    limit = max(1, min(limit, MAX_SEARCH_RESULTS))
+    results = task_store.search(q, limit)
+    
+    return FastJSONResponse({
+        "results": [
+            {"task": serialize_task(task), "score": round(score, 4), "archived": archived}
+            for task, score, archived in results
+        ],
+        "version": task_store.version
+    })
 
 @app.post("/api/tasks")
 async def create_task_endpoint(task_data: TaskCreate):
@@ -339,26 +796,91 @@ async def create_task_endpoint(task_data: TaskCreate):
     
     return {"task": task}
 
+@app.post("/api/tasks/claim")
+async def claim_task():
+    """Claim the most urgent pending task and mark it in progress"""
+    task = task_store.claim_next()
+    if task is None:
+        return {"task": None}
+    
+    task = serialize_task(task)
+    await broadcast_message({
+        "type": "task_updated",
+        "data": task
+    })
+    
+    return {"task": task}
+
+def check_bulk_size(count: int):
+    """Reject bulk requests that are too large to apply in one transaction"""
+    if count > MAX_BULK_OPERATIONS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_OPERATIONS} operations per bulk request")
+
+@app.post("/api/tasks/bulk")
+async def bulk_create_tasks(request: TaskBulkCreate):
+    """Create many tasks in one transaction"""
+    check_bulk_size(len(request.tasks))
+    created = create_tasks([task_data.dict() for task_data in request.tasks])
+    
+    await broadcast_tasks_changed(created=created)
+    
+    return {"tasks": created, "version": task_store.version}
+
+@app.patch("/api/tasks/bulk")
+async def bulk_update_tasks(request: TaskBulkUpdate):
+    """Update many tasks in one transaction"""
+    check_bulk_size(len(request.updates))
+    updated, not_found = [], []
+    
+    with task_store.transaction():
+        for item in request.updates:
+            update_data = item.dict(exclude_unset=True)
+            task_id = update_data.pop("id")
+            task = task_store.update(task_id, update_data)
+            if task is None:
+                not_found.append(task_id)
+            else:
+                updated.append(serialize_task(task))
+    
+    if updated:
+        await broadcast_tasks_changed(updated=updated)
+    
+    return {"tasks": updated, "not_found": not_found, "version": task_store.version}
+
+@app.delete("/api/tasks/bulk")
+async def bulk_delete_tasks(request: TaskBulkDelete):
+    """Delete many tasks in one transaction"""
+    check_bulk_size(len(request.ids))
+    deleted, not_found = [], []
+    
+    with task_store.transaction():
+        for task_id in request.ids:
+            if task_store.delete(task_id) is None:
+                not_found.append(task_id)
+            else:
+                deleted.append(task_id)
+    
+    if deleted:
+        await broadcast_tasks_changed(deleted=deleted)
+    
+    return {"deleted": deleted, "not_found": not_found, "version": task_store.version}
+
 @app.get("/api/tasks/{task_id}")
 async def get_task(task_id: str):
     """Get a specific task"""
-    if task_id not in tasks:
+    task = task_store.get(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
-    return {"task": tasks[task_id]}
+    return {"task": serialize_task(task)}
 
 @app.patch("/api/tasks/{task_id}")
 async def update_task(task_id: str, task_update: TaskUpdate):
     """Update a task"""
-    if task_id not in tasks:
-        raise HTTPException(status_code=404, detail="Task not found")
-    
-    task = tasks[task_id]
     update_data = task_update.dict(exclude_unset=True)
-    
-    for field, value in update_data.items():
-        task[field] = value
-    
-    task["updated_at"] = datetime.now().isoformat()
+    task = task_store.update(task_id, update_data)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    task = serialize_task(task)
     
     # Broadcast to WebSocket clients
     await broadcast_message({
@@ -371,11 +893,10 @@ async def update_task(task_id: str, task_update: TaskUpdate):
 @app.delete("/api/tasks/{task_id}")
 async def delete_task(task_id: str):
     """Delete a task"""
-    if task_id not in tasks:
+    deleted_task = task_store.delete(task_id)
+    if deleted_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    deleted_task = tasks.pop(task_id)
-    
     # Broadcast to WebSocket clients
     await broadcast_message({
         "type": "task_deleted",
@@ -386,87 +907,79 @@ async def delete_task(task_id: str):
 
 @app.post("/api/chat/message")
 async def chat_message(request: TaskCreationRequest):
-    """Have a conversation with the AI assistant"""
+    """Have a conversation with the AI assistant
+    
+    Turns of one conversation are handled one at a time, in order; different
+    conversations proceed in parallel and only ever see their own history.
+    """
+    conversation_id = request.conversation_id
+    history = chat_store.history(conversation_id)
     try:
-        # Add user message to chat history
-        user_message = {
-            "id": str(uuid.uuid4()),
-            "type": "user",
-            "content": request.message,
-            "timestamp": datetime.now().isoformat()
-        }
-        chat_messages.append(user_message)
-        
-        # Broadcast user message
-        await broadcast_message({
-            "type": "chat_message",
-            "data": user_message
-        })
-        
-        # Get conversational response from OpenAI
-        chat_response = await chat_with_openai(request.message, chat_messages)
-        
-        # Create assistant response
-        assistant_message = {
-            "id": str(uuid.uuid4()),
-            "type": "assistant",
-            "content": chat_response["content"],
-            "timestamp": datetime.now().isoformat()
-        }
-        chat_messages.append(assistant_message)
-        
-        # Broadcast assistant message
-        await broadcast_message({
-            "type": "chat_message",
-            "data": assistant_message
-        })
-        
-        # Analyze conversation to see if tasks should be created
-        analysis = await analyze_conversation_for_tasks(chat_messages)
-        created_tasks = []
-        
-        if analysis.get("should_create_tasks", False) and analysis.get("tasks"):
-            # Create tasks via MCP
-            created_tasks = await create_tasks_via_mcp(analysis["tasks"])
+        async with conversation_lock(conversation_id):
+            # Add user message to chat history
+            user_message = {
+                "id": str(uuid.uuid4()),
+                "type": "user",
+                "content": request.message,
+                "timestamp": datetime.now().isoformat(),
+                "conversation_id": conversation_id
+            }
+            history.append(user_message)
             
-            # Broadcast task creation events
-            for task in created_tasks:
-                await broadcast_message({
-                    "type": "task_created",
-                    "data": task
-                })
+            # Broadcast user message
+            await broadcast_message({
+                "type": "chat_message",
+                "data": user_message
+            })
             
-            # Add a system message about task creation
-            if created_tasks:
-                task_creation_message = {
-                    "id": str(uuid.uuid4()),
-                    "type": "system",
-                    "content": f"✅ I've automatically created {len(created_tasks)} task(s) based on our conversation: {', '.join([t['title'] for t in created_tasks])}",
-                    "timestamp": datetime.now().isoformat()
-                }
-                chat_messages.append(task_creation_message)
-                
-                await broadcast_message({
-                    "type": "chat_message",
-                    "data": task_creation_message
-                })
+            # Get conversational response from OpenAI, streamed to clients under the reply's ID
+            assistant_id = str(uuid.uuid4())
+            chat_response = await chat_with_openai(
+                request.message,
+                history.recent(CHAT_CONTEXT_MESSAGES),
+                message_id=assistant_id,
+                conversation_id=conversation_id
+            )
+            
+            # Create assistant response (replaces the streamed draft on clients)
+            assistant_message = {
+                "id": assistant_id,
+                "type": "assistant",
+                "content": chat_response["content"],
+                "timestamp": datetime.now().isoformat(),
+                "conversation_id": conversation_id
+            }
+            history.append(assistant_message)
+            
+            # Broadcast assistant message
+            await broadcast_message({
+                "type": "chat_message",
+                "data": assistant_message
+            })
+            
+            # Fold turns that aged out of the verbatim window into the summary, off the request path
+            context_builder.schedule_refresh(conversation_id, history.recent(CHAT_CONTEXT_MESSAGES))
+            
+            # Task analysis and creation run in the background pipeline; results arrive over /ws
+            queue_conversation_analysis(conversation_id, assistant_id, history.recent(ANALYSIS_CONTEXT_MESSAGES))
         
         return {
             "message": assistant_message,
+            "conversation_id": conversation_id,
             "conversation_continues": True,
-            "tasks_created": len(created_tasks),
-            "analysis": analysis.get("reasoning", "")
+            "analysis_pending": True
         }
     
     except Exception as e:
-        logger.error(f"Error in chat conversation: {e}")
+        logger.error(f"Error in chat conversation {conversation_id}: {e}")
         error_message = {
             "id": str(uuid.uuid4()),
             "type": "system",
             "content": f"Sorry, I encountered an error: {str(e)}",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": datetime.now().isoformat(),
+            "conversation_id": conversation_id
         }
-        chat_messages.append(error_message)
+        history.append(error_message)
         
         await broadcast_message({
             "type": "chat_message",
@@ -482,15 +995,60 @@ async def chat_create_task_legacy(request: TaskCreationRequest):
     return await chat_message(request)
 
 @app.get("/api/chat/messages")
-async def get_chat_messages():
-    """Get chat message history"""
-    return {"messages": chat_messages}
+async def get_chat_messages(
+    conversation_id: str = Query(DEFAULT_CONVERSATION_ID, pattern=CONVERSATION_ID_PATTERN),
+    before: Optional[int] = None,
+    limit: int = DEFAULT_CHAT_PAGE_SIZE
+):
+    """Get a page of a conversation's history, oldest first; pass next_before back as before for older messages"""
+    limit = max(1, min(limit, MAX_CHAT_PAGE_SIZE))
+    messages, has_more = chat_store.history(conversation_id).page(before, limit)
+    
+    return {
+        "conversation_id": conversation_id,
+        "messages": messages,
+        "next_before": messages[0]["seq"] if has_more and messages else None
+    }
+
+@app.get("/api/chat/conversations")
+async def get_chat_conversations(before: Optional[int] = None, limit: int = DEFAULT_CHAT_PAGE_SIZE):
+    """List conversations with their message counts, most recently active first; pass next_before back as before for more"""
+    limit = max(1, min(limit, MAX_CHAT_PAGE_SIZE))
+    conversations, has_more = chat_store.conversations(before, limit)
+    
+    return {
+        "conversations": conversations,
+        "next_before": conversations[-1]["last_seq"] if has_more and conversations else None
+    }
 
 @app.get("/api/status")
 async def get_automation_status():
     """Get automation system status"""
     return {"status": automation_status}
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """Get cache, pipeline and LLM admission counters"""
+    return {
+        "analysis_cache": analysis_cache.stats(),
+        "llm_single_flight": llm_flights.stats(),
+        "chat_context": {
+            "tokenizer": TOKENIZER,
+            "budget": context_builder.budget,
+            "cached_summaries": len(context_builder.summaries)
+        },
+        "analysis_queue_depth": pending_analysis_count(),
+        "analysis_conversations": len(analysis_workers),
+        "open_conversations": len(chat_store.histories),
+        "websocket": websocket_hub.stats(),
+        "websocket_coalescer": event_coalescer.stats(),
+        "archon_replication": {
+            "backlog": task_store.replication_backlog(),
+            "breaker": archon_client.breaker.stats()
+        },
+        "llm_governor": llm_governor.stats()
+    }
+
 @app.get("/api/logs")
 async def get_agent_logs():
     """Get recent agent logs for monitoring"""
@@ -541,8 +1099,11 @@ async def get_agent_logs():
         logger.error(f"Error reading logs: {e}")
         return {"logs": [{"level": "ERROR", "message": f"Failed to read logs: {str(e)}", "timestamp": datetime.now().isoformat()}]}
 
-async def process_task_real(task: Dict) -> bool:
-    """Process a task using Claude Code automation workflow"""
+async def process_task_real(task: Dict) -> Tuple[bool, Optional[str]]:
+    """Process a task using Claude Code automation workflow
+    
+    Returns whether it succeeded and the implementation output to keep with the task.
+    """
     try:
         task_description = task.get("description", "")
         task_title = task.get("title", "")
@@ -550,7 +1111,7 @@ async def process_task_real(task: Dict) -> bool:
         logger.info(f"Starting real task processing: {task_title}")
         
         # Initialize Claude Code automation
-        automation = ClaudeCodeAutomation(project_path=".")
+        automation = ClaudeCodeAutomation(project_path=".", llm_client=openai_client)
         await automation.initialize()
         
         # Create a formatted task for Claude Code
@@ -565,19 +1126,26 @@ async def process_task_real(task: Dict) -> bool:
         # Use Claude Code to implement the task
         result = await automation.claude_code_implement(claude_task)
         
+        output = result.get("output")
+        
         if result["status"] in ["implemented", "simulated_implementation"]:
             logger.info(f"Task completed successfully: {task_title}")
             
             # Add command output to chat if available
             execution_result = result.get("execution_result", {})
             if execution_result and execution_result.get("user_visible_output"):
+                output = f"{output or ''}\n\n{execution_result['user_visible_output']}".strip()
+                
+                # Report back in the conversation the task came from
+                conversation_id = task.get("conversation_id") or DEFAULT_CONVERSATION_ID
                 output_message = {
                     "id": str(uuid.uuid4()),
                     "type": "system",
                     "content": f"✅ Task '{task_title}' completed!\n\n{execution_result['user_visible_output']}",
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": datetime.now().isoformat(),
+                    "conversation_id": conversation_id
                 }
-                chat_messages.append(output_message)
+                chat_store.history(conversation_id).append(output_message)
                 
                 # Broadcast the system message
                 await broadcast_message({
@@ -585,14 +1153,14 @@ async def process_task_real(task: Dict) -> bool:
                     "data": output_message
                 })
             
-            return True
+            return True, output
         else:
             logger.error(f"Task implementation failed: {result.get('output', 'Unknown error')}")
-            return False
+            return False, output
             
     except Exception as e:
         logger.error(f"Error processing task {task.get('id')}: {e}")
-        return False
+        return False, str(e)
 
 # Removed hardcoded task type analysis - now handled by Claude Code
 
@@ -1677,12 +2245,10 @@ async def run_automation_loop():
             try:
                 cycle_start = datetime.now()
                 
-                # Check for pending tasks and process them
-                pending_tasks = [t for t in tasks.values() if t["status"] == "pending"]
-                if pending_tasks:
-                    task = pending_tasks[0]
-                    task["status"] = "in_progress"
-                    task["updated_at"] = datetime.now().isoformat()
+                # Claim the most urgent pending task and process it
+                record = task_store.claim_next()
+                if record:
+                    task = serialize_task(record)
                     automation_status["current_task"] = task["title"]
                     
                     await broadcast_message({
@@ -1691,23 +2257,28 @@ async def run_automation_loop():
                     })
                     
                     # Process the actual task
-                    success = await process_task_real(task)
-                    
-                    # Update task status based on result
-                    if success:
-                        task["status"] = "completed"
-                        logger.info(f"Task completed successfully: {task['title']}")
-                    else:
-                        task["status"] = "failed"
-                        logger.error(f"Task failed: {task['title']}")
+                    success, output = await process_task_real(task)
                     
-                    task["updated_at"] = datetime.now().isoformat()
+                    # Update task status based on result, keeping the output searchable
+                    fields = {"status": "completed" if success else "failed"}
+                    if output:
+                        fields["output"] = output
+                    updated = task_store.update(task["id"], fields)
                     automation_status["current_task"] = None
-                    
-                    await broadcast_message({
-                        "type": "task_updated",
-                        "data": task
-                    })
+                    if updated is None:
+                        # Deleted while it was being processed; nothing left to update
+                        logger.info(f"Task deleted during processing: {task['title']}")
+                    else:
+                        task = serialize_task(updated)
+                        if success:
+                            logger.info(f"Task completed successfully: {task['title']}")
+                        else:
+                            logger.error(f"Task failed: {task['title']}")
+                        
+                        await broadcast_message({
+                            "type": "task_updated",
+                            "data": task
+                        })
                 
                 # Calculate actual cycle duration
                 cycle_end = datetime.now()
@@ -1725,6 +2296,46 @@ async def run_automation_loop():
         logger.error(f"Automation loop failed: {e}")
         automation_status["running"] = False
 
+async def run_archiver():
+    """Background task that moves old finished tasks out of the hot task set"""
+    while True:
+        try:
+            # File and database I/O, so keep it off the event loop
+            archived = await asyncio.to_thread(task_store.archive_terminal, TASK_ARCHIVE_AFTER)
+            if archived:
+                logger.info(f"Archived {len(archived)} finished task(s)")
+                await broadcast_tasks_changed(archived=archived)
+                if len(archived) == ARCHIVE_BATCH_SIZE:
+                    # More are waiting; keep going without holding the store for one huge batch
+                    await asyncio.sleep(0)
+                    continue
+        except Exception as e:
+            logger.error(f"Error archiving tasks: {e}")
+        
+        await asyncio.sleep(ARCHIVE_SWEEP_INTERVAL)
+
+@app.on_event("shutdown")
+async def close_clients():
+    """Close pooled connections"""
+    await close_llm_client()
+    await close_archon_client()
+
+@app.on_event("startup")
+async def start_replicator():
+    """Start delivering queued tasks to Archon"""
+    asyncio.create_task(run_replicator())
+
+@app.on_event("startup")
+async def start_search_index():
+    """Build the search index in the background, so the first search does not have to"""
+    asyncio.create_task(asyncio.to_thread(task_store.build_search_index))
+
+@app.on_event("startup")
+async def start_archiver():
+    """Start archiving finished tasks when an archive is configured"""
+    if task_store.archive is not None and TASK_ARCHIVE_AFTER > 0:
+        asyncio.create_task(run_archiver())
+
 @app.post("/api/automation/start")
 async def start_automation(background_tasks: BackgroundTasks):
     """Start the automation system"""
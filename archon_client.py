@@ -0,0 +1,206 @@
+"""
+Async client for the Archon MCP server
+One pooled httpx client per process, so task creation never blocks the event loop and
+reuses keep-alive connections; batches are sent concurrently with a bounded fan-out,
+and a circuit breaker fails calls fast while Archon is known to be down
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Union
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHON_URL = "http://localhost:8181"
+# Connection pool limits (ARCHON_MAX_CONNECTIONS, ARCHON_MAX_KEEPALIVE)
+DEFAULT_MAX_CONNECTIONS = 10
+DEFAULT_MAX_KEEPALIVE = 10
+# Requests of one batch in flight at once (ARCHON_FAN_OUT)
+DEFAULT_FAN_OUT = 8
+# Seconds per request (ARCHON_TIMEOUT), with a shorter connect timeout
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_CONNECT_TIMEOUT = 3.0
+# Consecutive failures that open the breaker (ARCHON_BREAKER_FAILURES), and seconds it
+# stays open before letting one trial request through (ARCHON_BREAKER_RESET)
+DEFAULT_BREAKER_FAILURES = 5
+DEFAULT_BREAKER_RESET = 30.0
+
+
+class ArchonError(Exception):
+    """Archon answered, but not with a created task"""
+
+
+class CircuitOpenError(ArchonError):
+    """Archon is known to be unhealthy, so the request was not sent"""
+
+
+class CircuitBreaker:
+    """Closed -> open after failure_threshold consecutive failures -> half-open after reset_timeout
+
+    While open, allow() refuses everything. Half-open lets a single trial call through:
+    its success closes the breaker, its failure opens it again for another reset_timeout.
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_BREAKER_FAILURES, reset_timeout: float = DEFAULT_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_running = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def retry_in(self) -> float:
+        """Seconds until the breaker lets a trial call through (0 unless open)"""
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (reserves the trial call when half-open)"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_running:
+            self.trial_running = True
+            return True
+        return False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info("Archon circuit breaker closed")
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.trial_running or (self.opened_at is None and self.failures >= self.failure_threshold):
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+            logger.warning(f"Archon circuit breaker opened for {self.reset_timeout:.0f}s after {self.failures} failure(s)")
+        self.trial_running = False
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "retry_in": round(self.retry_in(), 1),
+            "times_opened": self.times_opened,
+        }
+
+
+class ArchonClient:
+    """Creates tasks in Archon over a persistent connection pool"""
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_ARCHON_URL,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive: int = DEFAULT_MAX_KEEPALIVE,
+        fan_out: int = DEFAULT_FAN_OUT,
+        timeout: float = DEFAULT_TIMEOUT,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.fan_out = fan_out
+        self.breaker = breaker or CircuitBreaker()
+        self.http = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+            timeout=httpx.Timeout(timeout, connect=min(timeout, DEFAULT_CONNECT_TIMEOUT)),
+        )
+
+    async def create_task(self, task_data: Dict) -> Dict:
+        """Create one task and return Archon's record
+
+        Raises CircuitOpenError without sending anything while the breaker is open, and
+        ArchonError or httpx.HTTPError when the request fails. Connection errors, timeouts
+        and 5xx answers count against the breaker; other answers show Archon is up.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Archon unavailable, retry in {self.breaker.retry_in():.0f}s")
+        try:
+            response = await self.http.post("/projects/tasks", json={
+                "title": task_data["title"],
+                "description": task_data["description"],
+                "requirements": task_data.get("requirements", []),
+                "acceptance_criteria": task_data.get("acceptance_criteria", []),
+                "priority": task_data.get("priority", "medium"),
+                "status": task_data.get("status", "pending"),
+            })
+        except httpx.HTTPError:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled mid-request: says nothing about Archon, but free the trial slot
+            self.breaker.trial_running = False
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        if response.status_code != 200:
+            raise ArchonError(f"Archon returned {response.status_code} for task '{task_data['title']}'")
+        return response.json()
+
+    async def create_tasks(self, tasks: List[Dict]) -> List[Union[Dict, Exception]]:
+        """Create several tasks concurrently, at most fan_out at a time
+
+        Returns once every request has settled: Archon's record or the exception, in input order.
+        """
+        slots = asyncio.Semaphore(self.fan_out)
+
+        async def create(task_data: Dict) -> Dict:
+            async with slots:
+                return await self.create_task(task_data)
+
+        return await asyncio.gather(*(create(task_data) for task_data in tasks), return_exceptions=True)
+
+    async def close(self):
+        await self.http.aclose()
+
+
+_client: Optional[ArchonClient] = None
+
+
+def create_archon_client() -> ArchonClient:
+    """Build a client for MCP_ARCHON_URL with pool and fan-out sized from the environment"""
+    return ArchonClient(
+        base_url=os.getenv("MCP_ARCHON_URL", DEFAULT_ARCHON_URL),
+        max_connections=int(os.getenv("ARCHON_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)),
+        max_keepalive=int(os.getenv("ARCHON_MAX_KEEPALIVE", DEFAULT_MAX_KEEPALIVE)),
+        fan_out=int(os.getenv("ARCHON_FAN_OUT", DEFAULT_FAN_OUT)),
+        timeout=float(os.getenv("ARCHON_TIMEOUT", DEFAULT_TIMEOUT)),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv("ARCHON_BREAKER_FAILURES", DEFAULT_BREAKER_FAILURES)),
+            reset_timeout=float(os.getenv("ARCHON_BREAKER_RESET", DEFAULT_BREAKER_RESET)),
+        ),
+    )
+
+
+def get_archon_client() -> ArchonClient:
+    """Get the process-wide client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = create_archon_client()
+    return _client
+
+
+async def close_archon_client():
+    """Close the process-wide client and its connections"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the Claude Code Automation API hot paths
+Runs offline against in-process components; no server or API key required
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+import requests
+
+import json_codec
+from archon_client import ArchonClient, CircuitBreaker, CircuitOpenError
+from llm_governor import BACKGROUND, LLMGovernor
+from task_models import Task, serialize_task
+from websocket_hub import EventCoalescer, WebSocketHub
+
+# Tasks per Archon batch, and how long the fake Archon takes to create one
+ARCHON_BATCH_SIZE = 20
+ARCHON_LATENCY = 0.05
+
+
+def make_task_data(i: int) -> Dict:
+    """Build API input for a representative task"""
+    return {
+        "title": f"Implement feature {i}",
+        "description": f"Add the requested behaviour for ticket {i} and cover it with tests",
+        "requirements": ["Follow existing conventions", "Keep the UI responsive"],
+        "acceptance_criteria": ["Feature works in the browser", "No console errors"],
+        "priority": ("critical", "high", "medium", "low")[i % 4],
+    }
+
+
+def make_legacy_task(task_data: Dict) -> Dict:
+    """Build a task the way api_server.create_task did before Task records"""
+    now = datetime.now().isoformat()
+    return {
+        "id": str(uuid.uuid4()),
+        "title": task_data["title"],
+        "description": task_data["description"],
+        "requirements": task_data.get("requirements", []),
+        "acceptance_criteria": task_data.get("acceptance_criteria", []),
+        "priority": task_data.get("priority", "medium"),
+        "status": "pending",
+        "created_at": now,
+        "updated_at": now
+    }
+
+
+def measure_memory(build: Callable[[], List]) -> float:
+    """Measure bytes allocated (and still alive) by build()"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def measure_time(func: Callable, repeat: int = 5) -> float:
+    """Best wall-clock time of several runs, in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_tasks(count: int):
+    """Memory per task and list serialization time: legacy dicts vs Task records"""
+    task_data = [make_task_data(i) for i in range(count)]
+
+    legacy_bytes = measure_memory(lambda: [make_legacy_task(data) for data in task_data])
+    record_bytes = measure_memory(lambda: [Task.new(data) for data in task_data])
+
+    print(f"Memory for {count} tasks:")
+    print(f"  dict tasks:   {legacy_bytes / 1024 / 1024:8.1f} MiB ({legacy_bytes / count:6.0f} B/task)")
+    print(f"  Task records: {record_bytes / 1024 / 1024:8.1f} MiB ({record_bytes / count:6.0f} B/task)")
+
+    legacy_tasks = [make_legacy_task(data) for data in task_data]
+    records = [Task.new(data) for data in task_data]
+    page = records[:100]
+
+    legacy_time = measure_time(lambda: json.dumps(legacy_tasks))
+    record_time = measure_time(lambda: json.dumps([serialize_task(task) for task in records]))
+    serialize_task.cache_clear()
+    cold_page = measure_time(lambda: json.dumps([serialize_task(task) for task in page]), repeat=1)
+    warm_page = measure_time(lambda: json.dumps([serialize_task(task) for task in page]))
+
+    print(f"Serialize {count} tasks to JSON:")
+    print(f"  dict tasks:   {legacy_time * 1000:8.1f} ms")
+    print(f"  Task records: {record_time * 1000:8.1f} ms")
+    print("Serialize one page of 100 tasks:")
+    print(f"  cold cache:   {cold_page * 1000:8.3f} ms")
+    print(f"  warm cache:   {warm_page * 1000:8.3f} ms")
+
+
+def bench_list_tasks(count: int):
+    """Encoding a GET /api/tasks response: stdlib json vs the fast codec"""
+    records = [Task.new(make_task_data(i)) for i in range(count)]
+
+    print(f"Encode a task list response (codec backend: {json_codec.BACKEND}):")
+    for size in (100, 1000, count):
+        body = {"tasks": [serialize_task(task) for task in records[:size]], "next_cursor": None, "version": size}
+        stdlib_time = measure_time(lambda: json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        codec_time = measure_time(lambda: json_codec.dumps_bytes(body))
+        print(f"  {size:>7} tasks: stdlib {stdlib_time * 1000:8.3f} ms, codec {codec_time * 1000:8.3f} ms")
+
+
+class FakeWebSocket:
+    """Stand-in for a connected client that accepts frames instantly"""
+
+    async def send_text(self, data: str):
+        pass
+
+    async def close(self):
+        pass
+
+
+class SlowWebSocket(FakeWebSocket):
+    """A client on a bad link: every frame takes 50 ms to send"""
+
+    async def send_text(self, data: str):
+        await asyncio.sleep(0.05)
+
+
+def bench_broadcast(count: int):
+    """Broadcasting one task event: encode per client vs encode once"""
+    message = {"type": "task_updated", "data": serialize_task(Task.new(make_task_data(0)))}
+
+    async def per_client(clients):
+        for websocket in clients:
+            await websocket.send_text(json.dumps(message))
+
+    async def encode_once(clients):
+        frame = json_codec.dumps(message)
+        for websocket in clients:
+            await websocket.send_text(frame)
+
+    print("Broadcast one task_updated frame:")
+    for clients in (10, 100, 1000):
+        sockets = [FakeWebSocket() for _ in range(clients)]
+        per_client_time = measure_time(lambda: asyncio.run(per_client(sockets)))
+        encode_once_time = measure_time(lambda: asyncio.run(encode_once(sockets)))
+        print(f"  {clients:>5} clients: per client {per_client_time * 1000:8.3f} ms, encode once {encode_once_time * 1000:8.3f} ms")
+
+    async def sequential_with_slow_client(clients):
+        frame = json_codec.dumps(message)
+        start = time.perf_counter()
+        for websocket in clients:
+            await websocket.send_text(frame)
+        return time.perf_counter() - start
+
+    async def hub_with_slow_client(clients):
+        hub = WebSocketHub()
+        connections = [hub.register(websocket) for websocket in clients]
+        start = time.perf_counter()
+        hub.broadcast(json_codec.dumps(message))
+        elapsed = time.perf_counter() - start
+        for connection in connections:
+            connection.close()
+        await asyncio.sleep(0)
+        return elapsed
+
+    print("Broadcast while one client is slow (50 ms per frame), time until the producer continues:")
+    for clients in (10, 100, 1000):
+        sockets = [SlowWebSocket()] + [FakeWebSocket() for _ in range(clients - 1)]
+        sequential_time = asyncio.run(sequential_with_slow_client(sockets))
+        hub_time = asyncio.run(hub_with_slow_client(sockets))
+        print(f"  {clients:>5} clients: await each send {sequential_time * 1000:8.3f} ms, hub enqueue {hub_time * 1000:8.3f} ms")
+
+    async def hub_with_subscriptions(clients, subscribed: bool):
+        hub = WebSocketHub(max_queue=10_000)
+        connections = [hub.register(FakeWebSocket()) for _ in range(clients)]
+        if subscribed:
+            # A dashboard per task, each watching only its own
+            for i, connection in enumerate(connections):
+                hub.subscribe(connection, [f"task:{i}"])
+        frame = json_codec.dumps(message)
+        start = time.perf_counter()
+        for _ in range(100):
+            hub.broadcast(frame, None, ["type:task_updated", "task:0"])
+        elapsed = (time.perf_counter() - start) / 100
+        queued = sum(len(connection.queue) for connection in connections) // 100
+        for connection in connections:
+            connection.close()
+        await asyncio.sleep(0)
+        return elapsed, queued
+
+    print("Broadcast one task's event, clients unfiltered vs each subscribed to its own task:")
+    for clients in (10, 100, 1000):
+        unfiltered_time, unfiltered_queued = asyncio.run(hub_with_subscriptions(clients, False))
+        subscribed_time, subscribed_queued = asyncio.run(hub_with_subscriptions(clients, True))
+        print(
+            f"  {clients:>5} clients: unfiltered {unfiltered_time * 1000:8.3f} ms ({unfiltered_queued} sends), "
+            f"subscribed {subscribed_time * 1000:8.3f} ms ({subscribed_queued} sends)"
+        )
+
+
+class CountingWebSocket(FakeWebSocket):
+    """A client that records how many frames (and bytes) it was sent"""
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    async def send_text(self, data: str):
+        self.frames += 1
+        self.bytes += len(data)
+
+
+def bench_coalesce(count: int):
+    """Frames a client receives for bursts of task events, with and without a coalescing window"""
+    status = {"running": True, "current_task": None, "loop_count": 0}
+
+    def key_func(message: Dict):
+        if message["type"] == "status_update":
+            return "automation_status"
+        if message["type"] == "task_updated":
+            return f"task:{message['data']['id']}"
+        return None
+
+    async def run(window: float) -> CountingWebSocket:
+        hub = WebSocketHub(max_queue=count * 8)
+        websocket = CountingWebSocket()
+        connection = hub.register(websocket)
+        coalescer = EventCoalescer(hub, window, key_func)
+        # What one automation pass does per task: status, claim, finish and the chat report
+        for i in range(count):
+            task = Task.new(make_task_data(i))
+            status["loop_count"] += 1
+            coalescer.publish({"type": "status_update", "data": status})
+            coalescer.publish({"type": "task_updated", "data": serialize_task(task.updated({"status": "in_progress"}))})
+            coalescer.publish({"type": "task_updated", "data": serialize_task(task.updated({"status": "completed"}))})
+            coalescer.publish({"type": "chat_message", "data": {"id": str(uuid.uuid4()), "type": "system", "content": f"Task {i} done"}})
+            await asyncio.sleep(0)
+        coalescer.flush()
+        while connection.queue:
+            await asyncio.sleep(0)
+        connection.close()
+        await asyncio.sleep(0)
+        return websocket
+
+    print(f"Client traffic for {count} task completions ({count * 4} events):")
+    for window in (0.0, 0.05):
+        websocket = asyncio.run(run(window))
+        print(f"  window {window * 1000:4.0f} ms: {websocket.frames:6} frames, {websocket.bytes / 1024:8.1f} KiB")
+
+
+class FakeArchonHandler(BaseHTTPRequestHandler):
+    """POST /projects/tasks that answers after ARCHON_LATENCY with the task and a new ID
+
+    Counts the requests it gets, and answers 500 straight away while failing is set.
+    """
+
+    protocol_version = "HTTP/1.1"
+    failing = False
+    requests = 0
+
+    def do_POST(self):
+        task = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        FakeArchonHandler.requests += 1
+        if FakeArchonHandler.failing:
+            self.send_response(500)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        time.sleep(ARCHON_LATENCY)
+        body = json.dumps({**task, "id": str(uuid.uuid4())}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+async def measure_stall(work: Callable[[], Awaitable]) -> Tuple[float, float]:
+    """Run work() next to a 1 ms heartbeat; returns (elapsed, longest the loop went unresponsive)"""
+    loop = asyncio.get_running_loop()
+    stalls = [0.0]
+    running = True
+
+    async def heartbeat():
+        while running:
+            before = loop.time()
+            await asyncio.sleep(0.001)
+            stalls.append(loop.time() - before - 0.001)
+
+    beats = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - start
+    running = False
+    await beats
+    return elapsed, max(stalls)
+
+
+def bench_archon(count: int):
+    """Creating a batch of tasks in a (fake, local) Archon: event-loop stall and total time"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeArchonHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    batch = [make_task_data(i) for i in range(min(count, ARCHON_BATCH_SIZE))]
+
+    async def blocking_requests():
+        for task_data in batch:
+            requests.post(f"{url}/projects/tasks", json=task_data, timeout=10)
+
+    async def threaded_requests():
+        for task_data in batch:
+            await asyncio.to_thread(requests.post, f"{url}/projects/tasks", json=task_data, timeout=10)
+
+    async def pooled_client():
+        # Built up front, as the server does at import: creating the SSL context blocks for a while
+        client = ArchonClient(url)
+        try:
+            # The first batch opens the pool's connections; the second reuses them
+            for _ in range(2):
+                elapsed, stall = await measure_stall(lambda: client.create_tasks(batch))
+            return elapsed, stall
+        finally:
+            await client.close()
+
+    print(f"Create {len(batch)} tasks in Archon ({ARCHON_LATENCY * 1000:.0f} ms per request):")
+    for name, run in (
+        ("blocking requests.post", lambda: measure_stall(blocking_requests)),
+        ("requests.post in a thread", lambda: measure_stall(threaded_requests)),
+        ("pooled async client", pooled_client),
+    ):
+        elapsed, stall = asyncio.run(run())
+        print(f"  {name:<26} total {elapsed * 1000:8.1f} ms, longest loop stall {stall * 1000:8.1f} ms")
+        if name == "pooled async client":
+            # Requests of a batch overlap, and nothing waits on the network on the loop
+            assert elapsed < len(batch) * ARCHON_LATENCY / 2, "pooled batch was not sent concurrently"
+            assert stall < ARCHON_LATENCY, "pooled batch blocked the event loop"
+
+    asyncio.run(check_archon_breaker(url))
+    server.shutdown()
+    server.server_close()
+
+
+async def check_archon_breaker(url: str):
+    """Drive ArchonClient through an outage and assert what reaches the server in each breaker state"""
+    failures, reset = 3, 0.2
+    client = ArchonClient(url, fan_out=1, breaker=CircuitBreaker(failure_threshold=failures, reset_timeout=reset))
+    breaker = client.breaker
+    batch = [make_task_data(i) for i in range(5)]
+
+    def sent_since(before: int) -> int:
+        return FakeArchonHandler.requests - before
+
+    try:
+        FakeArchonHandler.failing = True
+        # Closed: calls go out until the threshold is hit, then the rest of the batch is refused
+        before = FakeArchonHandler.requests
+        results = await client.create_tasks(batch)
+        assert sent_since(before) == failures, f"expected {failures} requests before opening, got {sent_since(before)}"
+        assert breaker.state == "open"
+        assert all(isinstance(result, CircuitOpenError) for result in results[failures:])
+
+        # Open: nothing is sent
+        before = FakeArchonHandler.requests
+        results = await client.create_tasks(batch)
+        assert sent_since(before) == 0, "requests went out while the breaker was open"
+        assert all(isinstance(result, CircuitOpenError) for result in results)
+
+        # Half-open: a single probe, whose failure opens the breaker again
+        await asyncio.sleep(reset * 1.2)
+        assert breaker.state == "half_open"
+        client.fan_out = len(batch)
+        before = FakeArchonHandler.requests
+        results = await client.create_tasks(batch)
+        assert sent_since(before) == 1, f"expected one half-open probe, got {sent_since(before)} requests"
+        assert breaker.state == "open"
+
+        # Archon is back: the next probe succeeds and closes the breaker, then batches flow again
+        FakeArchonHandler.failing = False
+        await asyncio.sleep(reset * 1.2)
+        before = FakeArchonHandler.requests
+        await client.create_task(batch[0])
+        assert breaker.state == "closed"
+        results = await client.create_tasks(batch)
+        assert sent_since(before) == 1 + len(batch)
+        assert not any(isinstance(result, Exception) for result in results)
+    finally:
+        FakeArchonHandler.failing = False
+        await client.close()
+
+    print(f"Circuit breaker: opens after {failures} failures, sends nothing while open, one probe when half-open, closes on success")
+
+
+def bench_governor(count: int):
+    """Admitting a burst of LLM calls past the token budget: only the refill timer can wake the last ones"""
+    tokens_per_min, tokens, callers = 6000, 10, 603
+
+    async def burst():
+        governor = LLMGovernor(requests_per_min=100_000, tokens_per_min=tokens_per_min, max_concurrency=16)
+        admitted = 0
+
+        async def call():
+            nonlocal admitted
+            async with governor.slot(BACKGROUND, tokens):
+                admitted += 1
+
+        start = time.perf_counter()
+        # The bucket covers 600 calls; the rest wait for the refill with nothing else going on
+        expected = (callers * tokens - tokens_per_min) / (tokens_per_min / 60)
+        try:
+            await asyncio.wait_for(asyncio.gather(*(call() for _ in range(callers))), expected + 5)
+        except asyncio.TimeoutError:
+            pass
+        return admitted, time.perf_counter() - start, expected
+
+    admitted, elapsed, expected = asyncio.run(burst())
+    print(f"Admit {callers} calls of {tokens} tokens at {tokens_per_min} tokens/min:")
+    print(f"  admitted {admitted} of {callers} in {elapsed * 1000:8.1f} ms (refill needs {expected * 1000:.0f} ms)")
+    assert admitted == callers, "waiters stalled: the refill timer did not wake them"
+
+
+BENCHMARKS = {
+    "tasks": bench_tasks,
+    "list_tasks": bench_list_tasks,
+    "broadcast": bench_broadcast,
+    "coalesce": bench_coalesce,
+    "archon": bench_archon,
+    "governor": bench_governor,
+}
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="API hot path benchmarks")
+    parser.add_argument("benchmarks", nargs="*", choices=[[]] + list(BENCHMARKS), help="Benchmarks to run (default: all)")
+    parser.add_argument("--count", type=int, default=100_000, help="Number of tasks to generate")
+
+    args = parser.parse_args()
+
+    for name in args.benchmarks or BENCHMARKS:
+        print(f"== {name} ==")
+        BENCHMARKS[name](args.count)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Chat history storage for the Claude Code Automation API
+Each conversation keeps its latest messages in a fixed-size ring buffer, backed by an
+append-only SQLite log shared by all conversations
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import itertools
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_messages (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    conversation_id TEXT NOT NULL DEFAULT 'default'
+);
+"""
+
+SQLITE_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_chat_messages_conversation ON chat_messages (conversation_id, seq);
+"""
+
+# Per-conversation summary kept by a trigger, so listing conversations never scans the log
+SQLITE_SUMMARY_SCHEMA = (
+    """
+    CREATE TABLE chat_conversations (
+        conversation_id TEXT PRIMARY KEY,
+        messages INTEGER NOT NULL,
+        last_seq INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX idx_chat_conversations_last_seq ON chat_conversations (last_seq)",
+    """
+    CREATE TRIGGER chat_conversations_summary AFTER INSERT ON chat_messages BEGIN
+        INSERT INTO chat_conversations (conversation_id, messages, last_seq) VALUES (NEW.conversation_id, 1, NEW.seq)
+        ON CONFLICT (conversation_id) DO UPDATE SET messages = messages + 1, last_seq = excluded.last_seq;
+    END
+    """,
+    # Logs written before the summary existed
+    """
+    INSERT INTO chat_conversations (conversation_id, messages, last_seq)
+    SELECT conversation_id, COUNT(*), MAX(seq) FROM chat_messages GROUP BY conversation_id
+    """,
+)
+
+# Conversation that requests without a conversation ID (and pre-conversation logs) belong to
+DEFAULT_CONVERSATION_ID = "default"
+# Messages kept in memory per conversation; older pages are read back from the log
+DEFAULT_CHAT_HISTORY_SIZE = 500
+# Conversations whose ring buffers stay loaded; SQLite reloads the others on demand, the
+# in-memory backend has nothing to reload them from and forgets them
+DEFAULT_OPEN_CONVERSATIONS = 1000
+# Conversations per page of conversations()
+DEFAULT_CONVERSATION_PAGE_SIZE = 50
+
+
+class InMemoryChatHistory:
+    """One conversation's history, keeping only the latest messages (used for tests and single-process runs)
+
+    Every message gets a sequence number ("seq"), which increases with each append and
+    doubles as the pagination cursor. Memory stays bounded by the ring buffer size.
+    Histories of one store draw seqs from a shared counter, as they do from the shared log
+    with SQLite, so seqs also order conversations by activity.
+    """
+
+    def __init__(
+        self,
+        conversation_id: str = DEFAULT_CONVERSATION_ID,
+        capacity: int = DEFAULT_CHAT_HISTORY_SIZE,
+        seqs: Optional[Iterator[int]] = None,
+    ):
+        self.conversation_id = conversation_id
+        self.capacity = capacity
+        self.recent_messages: "deque[Dict]" = deque(maxlen=capacity)
+        self.last_seq = 0
+        # Messages ever appended here, including those the ring buffer has let go
+        self.message_count = 0
+        self.lock = threading.RLock()
+        self._seqs = seqs if seqs is not None else itertools.count(1)
+
+    def append(self, message: Dict) -> Dict:
+        """Add a message, assigning its seq (the dict is updated in place and returned)"""
+        with self.lock:
+            message["seq"] = self._write(message)
+            self.recent_messages.append(message)
+            self.last_seq = message["seq"]
+            self.message_count += 1
+        return message
+
+    def recent(self, count: int) -> List[Dict]:
+        """Get the latest messages, oldest first"""
+        with self.lock:
+            self.refresh()
+            if count <= 0:
+                return []
+            start = max(0, len(self.recent_messages) - count)
+            return [self.recent_messages[i] for i in range(start, len(self.recent_messages))]
+
+    def page(self, before: Optional[int] = None, limit: int = 50) -> Tuple[List[Dict], bool]:
+        """Get up to limit messages with seq below before (latest page if None), oldest first
+
+        Also returns whether older messages exist.
+        """
+        with self.lock:
+            self.refresh()
+            buffered = [message for message in self.recent_messages if before is None or message["seq"] < before]
+            if len(buffered) > limit or not self._has_older(buffered[0]["seq"] if buffered else before):
+                return buffered[-limit:], len(buffered) > limit
+
+        # Reaches past the ring buffer
+        messages = self._read_before(before, limit + 1)
+        return messages[-limit:], len(messages) > limit
+
+    def refresh(self):
+        """Pick up messages appended by other processes (no-op for the in-memory backend)"""
+        pass
+
+    # Internals
+
+    def _has_older(self, seq: Optional[int]) -> bool:
+        """Whether the log holds messages older than seq that are not in the ring buffer"""
+        return False
+
+    def _write(self, message: Dict) -> int:
+        return next(self._seqs)
+
+    def _read_before(self, before: Optional[int], limit: int) -> List[Dict]:
+        return []
+
+
+class SQLiteChatHistory(InMemoryChatHistory):
+    """One conversation's history in the shared append-only SQLite log
+
+    Only the ring buffer lives in memory; paging further back reads the log.
+    Seqs come from the shared log, so they increase within a conversation but have gaps.
+    Like the task store, data_version tells us when another connection has appended.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, conversation_id: str = DEFAULT_CONVERSATION_ID, capacity: int = DEFAULT_CHAT_HISTORY_SIZE):
+        super().__init__(conversation_id, capacity)
+        self.conn = conn
+        self._data_version: Optional[int] = None
+        self.last_seq = self.conn.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM chat_messages WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()[0]
+        self.recent_messages.extend(self._read_before(None, capacity))
+        self._data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def refresh(self):
+        """Load messages other connections have appended since the last read"""
+        with self.lock:
+            data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return
+            self._data_version = data_version
+            self._load_new(None)
+
+    def _has_older(self, seq: Optional[int]) -> bool:
+        if seq is None:
+            return False
+        return self.conn.execute(
+            "SELECT 1 FROM chat_messages WHERE conversation_id = ? AND seq < ? LIMIT 1", (self.conversation_id, seq)
+        ).fetchone() is not None
+
+    def _write(self, message: Dict) -> int:
+        data = {key: value for key, value in message.items() if key != "seq"}
+        seq = self.conn.execute(
+            "INSERT INTO chat_messages (id, data, conversation_id) VALUES (?, ?, ?)",
+            (message["id"], json.dumps(data), self.conversation_id),
+        ).lastrowid
+        # Another process may have appended since our last refresh; keep the buffer in seq order
+        self._load_new(seq)
+        return seq
+
+    def _load_new(self, below: Optional[int]):
+        """Buffer messages after last_seq (and below the given seq, if any)"""
+        for seq, data in self.conn.execute(
+            "SELECT seq, data FROM chat_messages WHERE conversation_id = ? AND seq > ? AND seq < ? ORDER BY seq",
+            (self.conversation_id, self.last_seq, below if below is not None else 2 ** 63 - 1),
+        ):
+            self.recent_messages.append(self._decode(seq, data))
+            self.last_seq = seq
+
+    def _read_before(self, before: Optional[int], limit: int) -> List[Dict]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT seq, data FROM chat_messages WHERE conversation_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                (self.conversation_id, before if before is not None else self.last_seq + 1, limit),
+            ).fetchall()
+        return [self._decode(seq, data) for seq, data in reversed(rows)]
+
+    @staticmethod
+    def _decode(seq: int, data: str) -> Dict:
+        message = json.loads(data)
+        message["seq"] = seq
+        return message
+
+
+class InMemoryChatStore:
+    """Conversation ID -> that conversation's history
+
+    Conversations are independent: each has its own ring buffer and lock, so appending
+    to or reading one never waits on another. At most max_open histories are kept; the
+    least recently used one beyond that is dropped (and, in memory, forgotten).
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CHAT_HISTORY_SIZE, max_open: int = DEFAULT_OPEN_CONVERSATIONS):
+        self.capacity = capacity
+        self.max_open = max_open
+        self.histories: "OrderedDict[str, InMemoryChatHistory]" = OrderedDict()
+        self.lock = threading.Lock()
+        self._seqs = itertools.count(1)
+
+    def history(self, conversation_id: str = DEFAULT_CONVERSATION_ID) -> InMemoryChatHistory:
+        """Get a conversation's history, creating (or loading) it on first use"""
+        with self.lock:
+            history = self.histories.get(conversation_id)
+            if history is None:
+                history = self.histories[conversation_id] = self._open(conversation_id)
+                self._evict()
+            self.histories.move_to_end(conversation_id)
+            return history
+
+    def conversations(self, before: Optional[int] = None, limit: int = DEFAULT_CONVERSATION_PAGE_SIZE) -> Tuple[List[Dict], bool]:
+        """Conversation IDs with their message counts and latest seq, most recently active first
+
+        Pages like history pages: pass the last_seq of the last conversation as before for
+        the next one. Also returns whether more conversations follow.
+        """
+        with self.lock:
+            histories = list(self.histories.values())
+        summaries = [
+            {"id": history.conversation_id, "messages": history.message_count, "last_seq": history.last_seq}
+            for history in histories
+            if history.last_seq and (before is None or history.last_seq < before)
+        ]
+        summaries.sort(key=lambda summary: summary["last_seq"], reverse=True)
+        return summaries[:limit], len(summaries) > limit
+
+    def close(self):
+        """Release backend resources"""
+        pass
+
+    # Internals
+
+    def _open(self, conversation_id: str) -> InMemoryChatHistory:
+        return InMemoryChatHistory(conversation_id, self.capacity, self._seqs)
+
+    def _evict(self):
+        """Drop the least recently used histories beyond max_open"""
+        while len(self.histories) > self.max_open:
+            self.histories.popitem(last=False)
+
+
+class SQLiteChatStore(InMemoryChatStore):
+    """Per-conversation histories over one append-only SQLite log
+
+    Only recently used conversations keep their ring buffers loaded; the others are
+    read back from the log when next needed.
+    """
+
+    def __init__(self, db_path: str, capacity: int = DEFAULT_CHAT_HISTORY_SIZE, max_open: int = DEFAULT_OPEN_CONVERSATIONS):
+        super().__init__(capacity, max_open)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.executescript(SQLITE_SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(chat_messages)")}
+        if "conversation_id" not in columns:
+            # Logs from before conversations existed become the default conversation
+            self.conn.execute(
+                f"ALTER TABLE chat_messages ADD COLUMN conversation_id TEXT NOT NULL DEFAULT '{DEFAULT_CONVERSATION_ID}'"
+            )
+        self.conn.executescript(SQLITE_INDEXES)
+        self._create_summary()
+        logger.info(f"SQLite chat store opened at {db_path}")
+
+    def conversations(self, before: Optional[int] = None, limit: int = DEFAULT_CONVERSATION_PAGE_SIZE) -> Tuple[List[Dict], bool]:
+        rows = self.conn.execute(
+            "SELECT conversation_id, messages, last_seq FROM chat_conversations WHERE last_seq < ? ORDER BY last_seq DESC LIMIT ?",
+            (before if before is not None else 2 ** 63 - 1, limit + 1),
+        ).fetchall()
+        summaries = [{"id": conversation_id, "messages": count, "last_seq": last_seq} for conversation_id, count, last_seq in rows]
+        return summaries[:limit], len(summaries) > limit
+
+    def close(self):
+        """Close the database connection"""
+        with self.lock:
+            self.conn.close()
+
+    def _open(self, conversation_id: str) -> InMemoryChatHistory:
+        return SQLiteChatHistory(self.conn, conversation_id, self.capacity)
+
+    def _create_summary(self):
+        """Create and backfill the conversation summary, once per database"""
+        with self.lock:
+            # One process creates it; the trigger and the backfill land together
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                exists = self.conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chat_conversations'"
+                ).fetchone()
+                if not exists:
+                    for statement in SQLITE_SUMMARY_SCHEMA:
+                        self.conn.execute(statement)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+
+def create_chat_store(backend: Optional[str] = None, db_path: Optional[str] = None) -> InMemoryChatStore:
+    """Create the chat store configured by CHAT_STORE_BACKEND (sqlite or memory)"""
+    backend = backend or os.getenv("CHAT_STORE_BACKEND", "sqlite")
+    capacity = int(os.getenv("CHAT_HISTORY_SIZE", DEFAULT_CHAT_HISTORY_SIZE))
+    max_open = int(os.getenv("CHAT_OPEN_CONVERSATIONS", DEFAULT_OPEN_CONVERSATIONS))
+
+    if backend == "memory":
+        return InMemoryChatStore(capacity, max_open)
+    if backend == "sqlite":
+        db_path = db_path or os.getenv("CHAT_STORE_PATH", "chat.db")
+        return SQLiteChatStore(db_path, capacity, max_open)
+
+    raise ValueError(f"Unknown chat history backend: {backend}")
@@ -14,6 +14,10 @@ from typing import Dict, List, Optional, Any
 import logging
 from datetime import datetime
 
+from openai import AsyncOpenAI
+
+from llm_client import call_timeout, create_chat_completion, get_llm_client
+
 # Enhanced logging configuration with file output
 def setup_logging():
     log_dir = Path("logs")
@@ -55,9 +59,11 @@ def setup_logging():
 logger = setup_logging()
 
 class ClaudeCodeAutomation:
-    def __init__(self, project_path: str, archon_config: Optional[Dict] = None):
+    def __init__(self, project_path: str, archon_config: Optional[Dict] = None, llm_client: Optional[AsyncOpenAI] = None):
         self.project_path = Path(project_path)
         self.archon_config = archon_config or {}
+        # Shared pooled client unless one is injected
+        self.llm_client = llm_client or get_llm_client()
         self.claude_code_session = None
         self.simulation_mode = False
         self.claude_code_cmd = None
@@ -101,17 +107,11 @@ class ClaudeCodeAutomation:
         
         try:
             import requests
-            # Get pending tasks from our API server
-            response = requests.get('http://localhost:8009/api/tasks')
+            # Claim the most urgent pending task; the server marks it in_progress
+            response = requests.post('http://localhost:8009/api/tasks/claim')
             if response.status_code == 200:
-                tasks = response.json()['tasks']
-                # Find a pending task
-                pending_tasks = [t for t in tasks if t['status'] == 'pending']
-                if pending_tasks:
-                    task = pending_tasks[0]
-                    # Mark as in_progress
-                    requests.patch(f'http://localhost:8009/api/tasks/{task["id"]}', 
-                                 json={'status': 'in_progress'})
+                task = response.json()['task']
+                if task:
                     logger.info(f"Retrieved task: {task['title']}")
                     return task
                 else:
@@ -130,12 +130,6 @@ class ClaudeCodeAutomation:
         
         try:
             # Use OpenAI API to analyze and implement the task
-            from openai import AsyncOpenAI
-            import os
-            
-            # Initialize OpenAI client
-            openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-            
             # Get current project context using command line tools
             project_context = await self.get_project_context_with_cli()
             
@@ -175,11 +169,13 @@ COMMANDS:
 - Be very specific with the format - the system parses this automatically
 """
 
-            response = await openai_client.chat.completions.create(
+            response = await create_chat_completion(
+                self.llm_client,
                 model="gpt-4",
                 messages=[{"role": "user", "content": implementation_prompt}],
                 temperature=0.3,
-                max_tokens=2000
+                max_tokens=2000,
+                timeout=call_timeout("implementation")
             )
             
             implementation_plan = response.choices[0].message.content
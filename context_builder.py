@@ -0,0 +1,161 @@
+"""
+Token-budgeted prompt context for chat
+Recent turns are sent verbatim while they fit the budget; older turns are folded into a
+rolling summary that is cached per conversation and updated in the background
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - depends on the environment
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Tokens for the whole prompt: system prompt, summary and verbatim turns
+DEFAULT_CONTEXT_BUDGET = 3000
+# Longest a single turn may be when sent verbatim; longer pastes keep their head and tail
+MAX_MESSAGE_TOKENS = 1000
+# Length cap for the rolling summary
+SUMMARY_MAX_TOKENS = 400
+# Turns never folded into the summary, so the latest exchange is always verbatim
+KEEP_RECENT_TURNS = 6
+# Unsummarized older tokens needed before a summary refresh is worth a model call
+FOLD_MIN_TOKENS = 500
+# Conversations whose summaries are kept
+MAX_CACHED_SUMMARIES = 1000
+
+# Per-message framing the chat format adds on top of the content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_encoding = None
+if tiktoken is not None:
+    try:
+        _encoding = tiktoken.encoding_for_model("gpt-4")
+    except Exception:  # pragma: no cover - encoding files unavailable offline
+        _encoding = None
+
+TOKENIZER = "tiktoken" if _encoding is not None else "estimate"
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens locally (tiktoken when installed, otherwise ~4 characters per token)"""
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def truncate_tokens(text: str, limit: int) -> str:
+    """Shorten text to about limit tokens, keeping its beginning and end"""
+    if count_tokens(text) <= limit:
+        return text
+    half = max(1, limit // 2)
+    marker = "\n[...]\n"
+    if _encoding is not None:
+        tokens = _encoding.encode(text, disallowed_special=())
+        return _encoding.decode(tokens[:half]) + marker + _encoding.decode(tokens[-half:])
+    return text[:half * 4] + marker + text[-half * 4:]
+
+
+Summarizer = Callable[[str, List[Dict]], Awaitable[str]]
+
+
+class ContextBuilder:
+    """Builds chat prompts whose size depends on the budget, not on how long the messages are
+
+    Turns are chat history entries ({"type": "user"|"assistant", "content", "seq"}).
+    Each conversation has a cached summary covering every turn up to some seq; prompts
+    contain that summary plus the newest later turns that fit. After each exchange,
+    refresh() folds turns that have aged out of the recent window into the summary using
+    the injected summarizer, so building a prompt never waits on a model call.
+    """
+
+    def __init__(
+        self,
+        summarize: Summarizer,
+        budget: int = DEFAULT_CONTEXT_BUDGET,
+        max_message_tokens: int = MAX_MESSAGE_TOKENS,
+    ):
+        self.summarize = summarize
+        self.budget = budget
+        self.max_message_tokens = max_message_tokens
+        # Conversation ID -> (summary, seq of the last turn folded into it)
+        self.summaries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self.refreshing: Dict[str, asyncio.Task] = {}
+
+    def build(self, conversation_id: str, system_prompt: str, history: List[Dict]) -> List[Dict]:
+        """Get the messages to send: system prompt, summary of older turns, recent turns verbatim"""
+        summary, summarized_through = self._summary(conversation_id)
+        turns = [turn for turn in self._turns(history) if turn.get("seq", 0) > summarized_through]
+
+        remaining = self.budget - count_tokens(system_prompt) - MESSAGE_OVERHEAD_TOKENS
+        if summary:
+            remaining -= count_tokens(summary) + MESSAGE_OVERHEAD_TOKENS
+
+        recent = []
+        for turn in reversed(turns):
+            content = truncate_tokens(turn["content"], self.max_message_tokens)
+            cost = count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+            # The newest turn always goes in; older ones only while they fit
+            if recent and cost > remaining:
+                break
+            recent.append({"role": turn["type"], "content": content})
+            remaining -= cost
+        recent.reverse()
+
+        messages = [{"role": "system", "content": system_prompt}]
+        if summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+        return messages + recent
+
+    def schedule_refresh(self, conversation_id: str, history: List[Dict]):
+        """Fold aged-out turns into the summary in the background (at most one refresh per conversation)"""
+        if conversation_id in self.refreshing:
+            return
+        task = asyncio.create_task(self.refresh(conversation_id, history))
+        self.refreshing[conversation_id] = task
+        task.add_done_callback(lambda _: self.refreshing.pop(conversation_id, None))
+
+    async def refresh(self, conversation_id: str, history: List[Dict]):
+        """Fold turns older than the recent window into the conversation's summary"""
+        summary, summarized_through = self._summary(conversation_id)
+        turns = [turn for turn in self._turns(history) if turn.get("seq", 0) > summarized_through]
+        foldable = turns[:-KEEP_RECENT_TURNS] if len(turns) > KEEP_RECENT_TURNS else []
+        if sum(count_tokens(turn["content"]) for turn in foldable) < FOLD_MIN_TOKENS:
+            return
+
+        folded = [
+            {**turn, "content": truncate_tokens(turn["content"], self.max_message_tokens)}
+            for turn in foldable
+        ]
+        try:
+            summary = await self.summarize(summary, folded)
+        except Exception as e:
+            logger.error(f"Error summarizing conversation {conversation_id}: {e}")
+            return
+
+        self.summaries[conversation_id] = (truncate_tokens(summary.strip(), SUMMARY_MAX_TOKENS), foldable[-1]["seq"])
+        self.summaries.move_to_end(conversation_id)
+        while len(self.summaries) > MAX_CACHED_SUMMARIES:
+            self.summaries.popitem(last=False)
+
+    def forget(self, conversation_id: str):
+        """Drop a conversation's cached summary"""
+        self.summaries.pop(conversation_id, None)
+
+    # Internals
+
+    def _summary(self, conversation_id: str) -> Tuple[Optional[str], int]:
+        entry = self.summaries.get(conversation_id)
+        if entry is None:
+            return None, 0
+        self.summaries.move_to_end(conversation_id)
+        return entry
+
+    @staticmethod
+    def _turns(history: List[Dict]) -> List[Dict]:
+        return [message for message in history if message.get("type") in ("user", "assistant")]
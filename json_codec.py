@@ -0,0 +1,38 @@
+"""
+Fast JSON encoding for HTTP responses and WebSocket frames
+Uses orjson when it is installed and falls back to the standard library otherwise
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+# Matches the compact output of Starlette's JSONResponse
+_encoder = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Encode an object as UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return _encoder.encode(obj).encode("utf-8")
+
+
+def dumps(obj: Any) -> str:
+    """Encode an object as a JSON string (for WebSocket text frames)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return _encoder.encode(obj)
+
+
+def loads(data):
+    """Decode JSON from str or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,134 @@
+"""
+Caching for LLM results
+A small LRU cache with per-entry expiry, single-flight de-duplication of concurrent identical
+requests, and key helpers that ignore differences that cannot change a result
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Collapse runs of whitespace and trim, so formatting-only differences share a key"""
+    return WHITESPACE.sub(" ", text).strip()
+
+
+def conversation_key(system_prompt: str, messages: Iterable[Dict]) -> str:
+    """Hash of a prompt and a conversation window, ignoring message IDs and timestamps"""
+    window = [(message.get("type"), normalize_text(str(message.get("content", "")))) for message in messages]
+    payload = json.dumps([normalize_text(system_prompt), window], ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def request_key(model: str, messages: List[Dict], temperature: Optional[float] = None, max_tokens: Optional[int] = None) -> str:
+    """Hash of the parameters that determine a chat completion"""
+    payload = json.dumps([model, messages, temperature, max_tokens], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one
+
+    The first caller starts the call as its own task and everyone who arrives while it is
+    running awaits that same task. A caller that gives up (is cancelled) does not cancel
+    the call for the others. Nothing is kept once the call finishes.
+    """
+
+    def __init__(self):
+        self.in_flight: Dict[str, "asyncio.Future"] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Run call() unless an identical call is in flight, and return its result"""
+        task = self.in_flight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(call())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: "asyncio.Future"):
+        self.in_flight.pop(key, None)
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every caller was cancelled
+            task.exception()
+
+    def stats(self) -> Dict:
+        """Calls made, calls avoided by sharing, and calls running now"""
+        return {"calls": self.calls, "shared": self.shared, "in_flight": len(self.in_flight)}
+
+
+class TTLCache:
+    """Least-recently-used cache whose entries also expire after ttl seconds
+
+    Values are deep-copied on the way in and out, so callers can modify what they get back.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # Key -> (expires_at, value), least recently used first
+        self.entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a cached value, or None (counted as a miss) if absent or expired"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+        return copy.deepcopy(value)
+
+    def put(self, key: str, value: Any):
+        """Cache a value, evicting the least recently used entry when full"""
+        value = copy.deepcopy(value)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,176 @@
+"""
+Shared LLM client for the API server and the automation engine
+One pooled AsyncOpenAI client per process, so keep-alive connections and TLS sessions are reused,
+and one governor deciding when each call may start
+"""
+
+import asyncio
+import logging
+import os
+import random
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+
+from context_builder import MESSAGE_OVERHEAD_TOKENS, count_tokens
+from llm_cache import SingleFlight, request_key
+from llm_governor import BACKGROUND, INTERACTIVE, create_llm_governor
+
+logger = logging.getLogger(__name__)
+
+# Connection pool limits (LLM_MAX_CONNECTIONS, LLM_MAX_KEEPALIVE, LLM_KEEPALIVE_EXPIRY)
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE = 10
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+
+# Per-call-site request timeouts in seconds, overridable with LLM_TIMEOUT_<SITE>
+CALL_TIMEOUTS = {
+    "chat": 60.0,
+    "analysis": 45.0,
+    "summary": 45.0,
+    "implementation": 120.0,
+}
+
+# Attempts per call for 429s, 5xx and connection errors (LLM_MAX_ATTEMPTS); the delay doubles
+# from RETRY_BASE_DELAY with full jitter, unless the server sends Retry-After
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 20.0
+# Completion budget assumed for requests without max_tokens
+DEFAULT_COMPLETION_TOKENS = 1000
+
+_client: Optional[AsyncOpenAI] = None
+
+# Identical completions in flight at the same time share one call
+llm_flights = SingleFlight()
+
+# Rate limits, priorities and adaptive concurrency for every outbound call
+llm_governor = create_llm_governor()
+
+
+def call_timeout(site: str) -> httpx.Timeout:
+    """Timeout for one call site: its own read budget, with the shared connect timeout"""
+    seconds = float(os.getenv(f"LLM_TIMEOUT_{site.upper()}", CALL_TIMEOUTS[site]))
+    connect = float(os.getenv("LLM_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT))
+    return httpx.Timeout(seconds, connect=connect)
+
+
+def create_llm_client() -> AsyncOpenAI:
+    """Build an AsyncOpenAI client with a pool sized from the environment
+
+    LLM_BASE_URL points every caller at another OpenAI-compatible endpoint, such as
+    llm_stub_server.py for offline load tests.
+    """
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)),
+        max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", DEFAULT_MAX_KEEPALIVE)),
+        keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", DEFAULT_KEEPALIVE_EXPIRY)),
+    )
+    http_client = httpx.AsyncClient(limits=limits, timeout=call_timeout("chat"))
+    logger.info(
+        f"LLM client pool: {limits.max_connections} connections, "
+        f"{limits.max_keepalive_connections} kept alive for {limits.keepalive_expiry}s"
+    )
+    base_url = os.getenv("LLM_BASE_URL") or None
+    api_key = os.getenv("OPENAI_API_KEY")
+    if base_url:
+        logger.info(f"LLM client using base URL {base_url}")
+        # Local stand-ins do not check keys, but the client insists on one
+        api_key = api_key or "stub"
+    # Retries go through the governor instead, so backoff also lowers the concurrency limit
+    return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
+
+
+def get_llm_client() -> AsyncOpenAI:
+    """Get the process-wide client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = create_llm_client()
+    return _client
+
+
+async def close_llm_client():
+    """Close the process-wide client and its connections"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def estimate_tokens(request: Dict) -> int:
+    """Tokens a request may use at most: its prompt plus the completion budget"""
+    prompt = sum(count_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS for message in request["messages"])
+    return prompt + (request.get("max_tokens") or DEFAULT_COMPLETION_TOKENS)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, server errors and connection problems (including timeouts) are worth retrying"""
+    return isinstance(error, (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError))
+
+
+def retry_delay(error: Exception, attempt: int) -> float:
+    """Seconds to wait before the next attempt: the server's Retry-After, or jittered backoff"""
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            return min(float(response.headers.get("retry-after")), RETRY_MAX_DELAY)
+        except (TypeError, ValueError):
+            pass
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+
+async def _governed_completion(client: AsyncOpenAI, priority: int, request: Dict):
+    tokens = estimate_tokens(request)
+    attempts = int(os.getenv("LLM_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS))
+    for attempt in range(1, attempts + 1):
+        try:
+            async with llm_governor.slot(priority, tokens) as slot:
+                response = await client.chat.completions.create(**request)
+                slot.used_tokens(response.usage.total_tokens if response.usage else None)
+                return response
+        except Exception as e:
+            if attempt == attempts or not is_retryable(e):
+                raise
+            delay = retry_delay(e, attempt)
+            logger.warning(f"LLM call failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def create_chat_completion(client: AsyncOpenAI, priority: int = BACKGROUND, **request):
+    """client.chat.completions.create, admitted by the governor at the given priority and retried
+    on transient errors, with concurrent identical requests sharing one call"""
+    key = request_key(request["model"], request["messages"], request.get("temperature"), request.get("max_tokens"))
+    return await llm_flights.do(key, lambda: _governed_completion(client, priority, request))
+
+
+async def stream_chat_deltas(client: AsyncOpenAI, priority: int = INTERACTIVE, **request) -> AsyncIterator[str]:
+    """Stream a chat completion's content pieces, holding one governor slot for the whole stream
+
+    Opening the stream is retried like create_chat_completion; once content has been
+    yielded, errors propagate.
+    """
+    tokens = estimate_tokens(request)
+    attempts = int(os.getenv("LLM_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS))
+    for attempt in range(1, attempts + 1):
+        started = False
+        try:
+            async with llm_governor.slot(priority, tokens) as slot:
+                stream = await client.chat.completions.create(stream=True, **request)
+                async for chunk in stream:
+                    slot.responded()
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        started = True
+                        yield delta
+                return
+        except Exception as e:
+            if started or attempt == attempts or not is_retryable(e):
+                raise
+            delay = retry_delay(e, attempt)
+            logger.warning(f"LLM stream failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
@@ -0,0 +1,260 @@
+"""
+Admission control for outbound LLM calls
+Token buckets for requests/min and tokens/min, priority queueing (interactive before background)
+and an AIMD concurrency limit that backs off on 429s and slow responses
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Priorities: lower is served first
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+DEFAULT_REQUESTS_PER_MIN = 500
+DEFAULT_TOKENS_PER_MIN = 40_000
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_MIN_CONCURRENCY = 1
+# Responses slower than this (seconds until the first token or the full reply) count as overload
+DEFAULT_LATENCY_TARGET = 30.0
+
+# Multiplicative decrease on a 429, and (gentler) on a response over the latency target
+RATE_LIMIT_BACKOFF = 0.5
+LATENCY_BACKOFF = 0.8
+# Slots background work leaves free for interactive calls once the limit allows it
+INTERACTIVE_RESERVE = 1
+# Wait-time samples kept per priority for the metrics
+WAIT_SAMPLES = 1000
+
+
+class TokenBucket:
+    """Refills continuously at per_minute/60 per second, holding at most one minute's worth"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until amount is available (amounts above capacity only need a full bucket)"""
+        missing = min(amount, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount: float):
+        """Remove amount; may go negative when a request used more than was reserved"""
+        self.level -= amount
+
+
+class Slot:
+    """One call's admission: entering waits for it, leaving hands it back
+
+    Inside the block, tell it when the response started and how many tokens were really used.
+    """
+
+    def __init__(self, governor: "LLMGovernor", priority: int, tokens: int):
+        self.governor = governor
+        self.priority = priority
+        self.tokens = tokens
+        self.started = 0.0
+        self.response_latency: Optional[float] = None
+        self.actual_tokens: Optional[int] = None
+
+    def responded(self):
+        """Mark the first byte of the response (streams call this on the first chunk)"""
+        if self.response_latency is None:
+            self.response_latency = time.monotonic() - self.started
+
+    def used_tokens(self, tokens: Optional[int]):
+        self.actual_tokens = tokens
+
+    async def __aenter__(self) -> "Slot":
+        await self.governor.acquire(self.priority, self.tokens)
+        self.started = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.responded()
+        rate_limited = getattr(exc, "status_code", None) == 429
+        self.governor.release(self, rate_limited)
+
+
+class LLMGovernor:
+    """Decides when an LLM call may start
+
+    A call waits in a priority queue until it fits under the concurrency limit and both
+    token buckets can cover it (one request, plus its prompt and max_tokens estimate;
+    the real usage is settled afterwards). Background calls leave INTERACTIVE_RESERVE
+    slots free so chat stays responsive while analyses and implementations are queued.
+
+    The limit follows AIMD: +1/limit per call that finished within the latency target,
+    halved on a 429 and cut by a fifth on a slow response (at most once per latency
+    target window, so a burst of errors counts once).
+    """
+
+    def __init__(
+        self,
+        requests_per_min: float = DEFAULT_REQUESTS_PER_MIN,
+        tokens_per_min: float = DEFAULT_TOKENS_PER_MIN,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        min_concurrency: int = DEFAULT_MIN_CONCURRENCY,
+        latency_target: float = DEFAULT_LATENCY_TARGET,
+    ):
+        self.requests = TokenBucket(requests_per_min)
+        self.tokens = TokenBucket(tokens_per_min)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.latency_target = latency_target
+        self.limit = float(max(min_concurrency, min(4, max_concurrency)))
+        self.in_flight = 0
+        self.waiters: List[Tuple[int, int, int, float, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._last_decrease = float("-inf")
+        self.waits: Dict[int, Deque[float]] = {priority: deque(maxlen=WAIT_SAMPLES) for priority in PRIORITY_NAMES}
+        self.admitted = {priority: 0 for priority in PRIORITY_NAMES}
+        self.rate_limited = 0
+        self.slow_responses = 0
+
+    def slot(self, priority: int, tokens: int) -> Slot:
+        """Admission for one call estimated at tokens: use as `async with governor.slot(...) as slot`"""
+        return Slot(self, priority, tokens)
+
+    async def acquire(self, priority: int, tokens: int):
+        """Wait until a call of this priority and size may start (pair with release)"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        enqueued = time.monotonic()
+        heapq.heappush(self.waiters, (priority, next(self._order), tokens, enqueued, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as the caller gave up; hand the slot back
+                self.in_flight -= 1
+                self._dispatch()
+            raise
+        self.waits[priority].append(time.monotonic() - enqueued)
+
+    def release(self, slot: Slot, rate_limited: bool = False):
+        """Return a slot, settle its token usage and adapt the concurrency limit"""
+        self.in_flight -= 1
+        if slot.actual_tokens is not None:
+            self.tokens.take(slot.actual_tokens - slot.tokens)
+
+        now = time.monotonic()
+        latency = slot.response_latency or 0.0
+        if rate_limited:
+            self.rate_limited += 1
+            self._decrease(now, RATE_LIMIT_BACKOFF, "rate limited")
+        elif latency > self.latency_target:
+            self.slow_responses += 1
+            self._decrease(now, LATENCY_BACKOFF, f"slow response ({latency:.1f}s)")
+        else:
+            self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+        self._dispatch()
+
+    def stats(self) -> Dict:
+        """Limit, load, queue depth and wait times per priority"""
+        queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, _, _, future in self.waiters:
+            if not future.done():
+                queued[PRIORITY_NAMES[priority]] += 1
+        waits = {}
+        for priority, samples in self.waits.items():
+            ordered = sorted(samples)
+            waits[PRIORITY_NAMES[priority]] = {
+                "admitted": self.admitted[priority],
+                "avg_ms": round(sum(ordered) / len(ordered) * 1000, 1) if ordered else 0.0,
+                "p95_ms": round(ordered[int(len(ordered) * 0.95)] * 1000, 1) if ordered else 0.0,
+                "max_ms": round(ordered[-1] * 1000, 1) if ordered else 0.0,
+            }
+        return {
+            "concurrency_limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queue_depth": queued,
+            "wait": waits,
+            "requests_available": round(self.requests.level, 1),
+            "tokens_available": round(self.tokens.level),
+            "rate_limited": self.rate_limited,
+            "slow_responses": self.slow_responses,
+        }
+
+    # Internals
+
+    def _decrease(self, now: float, factor: float, reason: str):
+        if now - self._last_decrease < self.latency_target:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_concurrency, self.limit * factor)
+        logger.warning(f"LLM concurrency limit lowered to {self.limit:.2f}: {reason}")
+
+    def _dispatch(self):
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+
+        while self.waiters:
+            priority, _, tokens, _, future = self.waiters[0]
+            if future.done():
+                # Cancelled while queued
+                heapq.heappop(self.waiters)
+                continue
+
+            limit = int(self.limit)
+            if priority != INTERACTIVE and limit > INTERACTIVE_RESERVE:
+                limit -= INTERACTIVE_RESERVE
+            if self.in_flight >= limit:
+                return
+
+            wait = max(self.requests.time_until(1), self.tokens.time_until(tokens))
+            if wait > 0:
+                self._wake_in(wait)
+                return
+
+            heapq.heappop(self.waiters)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.in_flight += 1
+            self.admitted[priority] += 1
+            future.set_result(None)
+
+    def _wake_in(self, delay: float):
+        loop = asyncio.get_running_loop()
+        when = loop.time() + delay
+        if self._timer is not None and self._timer.when() <= when:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = loop.call_at(when, self._wake)
+
+    def _wake(self):
+        # The timer has fired; forget it so the next wait can schedule a new one
+        self._timer = None
+        self._dispatch()
+
+
+def create_llm_governor() -> LLMGovernor:
+    """Build the governor from LLM_REQUESTS_PER_MIN, LLM_TOKENS_PER_MIN, LLM_MAX_CONCURRENCY,
+    LLM_MIN_CONCURRENCY and LLM_LATENCY_TARGET"""
+    return LLMGovernor(
+        requests_per_min=float(os.getenv("LLM_REQUESTS_PER_MIN", DEFAULT_REQUESTS_PER_MIN)),
+        tokens_per_min=float(os.getenv("LLM_TOKENS_PER_MIN", DEFAULT_TOKENS_PER_MIN)),
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+        min_concurrency=int(os.getenv("LLM_MIN_CONCURRENCY", DEFAULT_MIN_CONCURRENCY)),
+        latency_target=float(os.getenv("LLM_LATENCY_TARGET", DEFAULT_LATENCY_TARGET)),
+    )
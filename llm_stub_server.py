@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible stub server for offline load tests and benchmarks
+Implements POST /v1/chat/completions (including streaming) with templated responses,
+configurable latency and injected 429/500 errors
+
+Usage:
+    python llm_stub_server.py --port 8010 --latency normal:0.8,0.2 --rate-limit-rate 0.05
+    LLM_BASE_URL=http://localhost:8010/v1 python api_server.py
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+import json_codec
+from context_builder import count_tokens
+
+
+class LatencyModel:
+    """A latency distribution parsed from a spec like "fixed:0.5", "uniform:0.2,1.0",
+    "normal:0.8,0.2" or "lognormal:-0.5,0.4" (seconds; never negative)"""
+
+    def __init__(self, spec: str = "fixed:0"):
+        kind, _, params = spec.partition(":")
+        values = [float(value) for value in params.split(",") if value]
+        samplers = {
+            "fixed": lambda: values[0],
+            "uniform": lambda: random.uniform(values[0], values[1]),
+            "normal": lambda: random.gauss(values[0], values[1]),
+            "lognormal": lambda: random.lognormvariate(values[0], values[1]),
+        }
+        if kind not in samplers:
+            raise ValueError(f"Unknown latency distribution: {spec}")
+        self.spec = spec
+        self.sampler = samplers[kind]
+
+    def sample(self) -> float:
+        return max(0.0, self.sampler())
+
+
+class StubConfig:
+    """Behaviour of the stub: delays before the first token and between tokens, and error rates"""
+
+    def __init__(
+        self,
+        latency: str = "fixed:0",
+        token_latency: str = "fixed:0",
+        rate_limit_rate: float = 0.0,
+        server_error_rate: float = 0.0,
+        retry_after: float = 1.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency = LatencyModel(latency)
+        self.token_latency = LatencyModel(token_latency)
+        self.rate_limit_rate = rate_limit_rate
+        self.server_error_rate = server_error_rate
+        self.retry_after = retry_after
+        if seed is not None:
+            random.seed(seed)
+
+
+# Responses by prompt type
+
+def analysis_response(messages: List[Dict]) -> str:
+    """Task-analysis JSON, as analyze_conversation_for_tasks expects"""
+    conversation = messages[-1]["content"]
+    lines = [line.split(":", 1)[1].strip() for line in conversation.splitlines() if line.startswith("user:")]
+    request = lines[-1] if lines else "the requested change"
+    return json_codec.dumps({
+        "should_create_tasks": True,
+        "reasoning": "The user asked for a concrete, actionable change.",
+        "tasks": [{
+            "title": request[:60].capitalize(),
+            "description": f"Implement the user's request: {request}",
+            "requirements": ["Follow existing project conventions", "Keep the UI responsive"],
+            "acceptance_criteria": ["The change is visible in the browser", "No console errors"],
+            "priority": "medium",
+        }],
+    })
+
+
+def implementation_response(messages: List[Dict]) -> str:
+    """An ANALYSIS:/COMMANDS: plan, as claude_code_implement parses it (read-only commands only)"""
+    match = re.search(r"\*\*Task\*\*: (.*)", messages[-1]["content"])
+    title = match.group(1).strip() if match else "the task"
+    return (
+        f"ANALYSIS: Inspect the project files relevant to {title}\n\n"
+        "COMMANDS:\n"
+        "- ls -la\n"
+        "- ls src\n"
+        "- cat package.json\n"
+    )
+
+
+def summary_response(messages: List[Dict]) -> str:
+    words = messages[-1]["content"].split()
+    return "The user and assistant discussed: " + " ".join(words[-40:])
+
+
+def chat_response(messages: List[Dict]) -> str:
+    request = messages[-1]["content"].strip().rstrip(".!?")
+    return f"Great! I'll create a task for that: {request[:200]}. It will be picked up by the automation loop shortly."
+
+
+def render_response(messages: List[Dict]) -> str:
+    """Pick a response template from what the prompt looks like"""
+    system = messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+    last = messages[-1]["content"] if messages else ""
+    if "analyzes conversations" in system:
+        return analysis_response(messages)
+    if "COMMANDS:" in last:
+        return implementation_response(messages)
+    if "running summary" in system:
+        return summary_response(messages)
+    return chat_response(messages)
+
+
+def tokenize_response(text: str) -> List[str]:
+    """Split a response into stream pieces (words with their trailing whitespace)"""
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+def create_app(config: StubConfig) -> FastAPI:
+    app = FastAPI(title="OpenAI stub", version="1.0.0")
+    stats = {"requests": 0, "streamed": 0, "rate_limited": 0, "server_errors": 0}
+
+    def error(status: int, message: str, kind: str, headers: Optional[Dict] = None) -> JSONResponse:
+        return JSONResponse(
+            {"error": {"message": message, "type": kind, "param": None, "code": None}},
+            status_code=status,
+            headers=headers,
+        )
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+
+        roll = random.random()
+        if roll < config.rate_limit_rate:
+            stats["rate_limited"] += 1
+            return error(429, "Rate limit reached (injected by stub)", "rate_limit_error",
+                         {"Retry-After": str(config.retry_after)})
+        if roll < config.rate_limit_rate + config.server_error_rate:
+            stats["server_errors"] += 1
+            return error(500, "Internal server error (injected by stub)", "server_error")
+
+        messages = body.get("messages", [])
+        model = body.get("model", "gpt-4")
+        text = render_response(messages)
+        max_tokens = body.get("max_tokens")
+        pieces = tokenize_response(text)
+        if max_tokens:
+            pieces = pieces[:max_tokens]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        prompt_tokens = sum(count_tokens(message.get("content") or "") for message in messages)
+
+        await asyncio.sleep(config.latency.sample())
+
+        if not body.get("stream"):
+            content = "".join(pieces)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(pieces),
+                    "total_tokens": prompt_tokens + len(pieces),
+                },
+            }
+
+        stats["streamed"] += 1
+
+        def chunk(delta: Dict, finish_reason: Optional[str] = None) -> str:
+            return "data: " + json_codec.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }) + "\n\n"
+
+        async def events():
+            yield chunk({"role": "assistant", "content": ""})
+            for piece in pieces:
+                yield chunk({"content": piece})
+                await asyncio.sleep(config.token_latency.sample())
+            yield chunk({}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": "gpt-4", "object": "model", "owned_by": "stub"}]}
+
+    @app.get("/stub/stats")
+    async def get_stats():
+        return {
+            **stats,
+            "latency": config.latency.spec,
+            "token_latency": config.token_latency.spec,
+            "rate_limit_rate": config.rate_limit_rate,
+            "server_error_rate": config.server_error_rate,
+        }
+
+    return app
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--latency", default="fixed:0", help="Delay before the response/first token, e.g. normal:0.8,0.2")
+    parser.add_argument("--token-latency", default="fixed:0", help="Delay between streamed tokens, e.g. uniform:0.01,0.05")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--server-error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible runs")
+
+    args = parser.parse_args()
+    config = StubConfig(
+        latency=args.latency,
+        token_latency=args.token_latency,
+        rate_limit_rate=args.rate_limit_rate,
+        server_error_rate=args.server_error_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Full-text search over tasks
+An inverted index kept up to date on every task change, ranked with BM25
+"""
+
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+from task_models import Task
+
+# BM25 parameters: term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Title words count this many times, so a match in the title outranks one in the body
+TITLE_WEIGHT = 2
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def task_terms(task: Task) -> Counter:
+    """Term frequencies for the searchable fields of a task"""
+    terms = Counter()
+    for _ in range(TITLE_WEIGHT):
+        terms.update(tokenize(task.title))
+    terms.update(tokenize(task.description))
+    for requirement in task.requirements:
+        terms.update(tokenize(requirement))
+    output = (task.extra or {}).get("output")
+    if isinstance(output, str):
+        terms.update(tokenize(output))
+    return terms
+
+
+class TaskSearchIndex:
+    """Inverted index from terms to the tasks that contain them
+
+    Postings map each term to {task ID: term frequency}. A query only touches the
+    postings of its own terms: rare terms are scored first, and once the remaining
+    terms cannot lift an unseen task into the top results (their best possible BM25
+    contribution is below the current k-th score) they only re-score tasks already found.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        # Task ID -> its term frequencies, needed to take it back out of the postings
+        self.doc_terms: Dict[str, Dict[str, int]] = {}
+        self.doc_length: Dict[str, int] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self.doc_terms
+
+    def add(self, task: Task):
+        """Index a task, replacing what was indexed for it before"""
+        terms = task_terms(task)
+        if self.doc_terms.get(task.id) == terms:
+            # Status changes and other unsearchable edits leave the postings alone
+            return
+        self.remove(task.id)
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[task.id] = frequency
+        self.doc_terms[task.id] = dict(terms)
+        length = sum(terms.values())
+        self.doc_length[task.id] = length
+        self.total_length += length
+
+    def remove(self, task_id: str):
+        """Take a task out of the index"""
+        terms = self.doc_terms.pop(task_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self.postings[term]
+            del postings[task_id]
+            if not postings:
+                del self.postings[term]
+        self.total_length -= self.doc_length.pop(task_id)
+
+    def clear(self):
+        self.postings = {}
+        self.doc_terms = {}
+        self.doc_length = {}
+        self.total_length = 0
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[str, float]]:
+        """Get the IDs of the best matching tasks with their BM25 scores, best first"""
+        count = len(self.doc_terms)
+        if not count or limit <= 0:
+            return []
+
+        terms = []
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if postings:
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                terms.append((len(postings), term, idf))
+        if not terms:
+            return []
+        # Rarest (highest idf) first
+        terms.sort()
+
+        average_length = self.total_length / count
+        base = BM25_K1 * (1 - BM25_B)
+        per_length = BM25_K1 * BM25_B / average_length
+        doc_length = self.doc_length
+
+        # A term adds at most idf * (k1 + 1), reached as its frequency grows without bound
+        remaining_bound = sum(idf * (BM25_K1 + 1) for _, _, idf in terms)
+        scores: Dict[str, float] = {}
+        threshold = 0.0
+        for _, term, idf in terms:
+            weight = idf * (BM25_K1 + 1)
+            remaining_bound -= weight
+            postings = self.postings[term]
+            if len(scores) >= limit and remaining_bound + weight <= threshold:
+                # No task missing from scores can reach the top results any more
+                for task_id, score in scores.items():
+                    frequency = postings.get(task_id)
+                    if frequency:
+                        scores[task_id] = score + weight * frequency / (frequency + base + per_length * doc_length[task_id])
+            else:
+                get = scores.get
+                for task_id, frequency in postings.items():
+                    scores[task_id] = get(task_id, 0.0) + weight * frequency / (frequency + base + per_length * doc_length[task_id])
+            if len(scores) >= limit and remaining_bound:
+                threshold = heapq.nlargest(limit, scores.values())[-1]
+
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+    def add_all(self, tasks: Iterable[Task]):
+        """Index many tasks (used to build the index from scratch)"""
+        for task in tasks:
+            self.add(task)
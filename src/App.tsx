@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { ChatInterface } from './components/ChatInterface';
 import { TaskList } from './components/TaskList';
 import { AutomationStatusComponent } from './components/AutomationStatus';
@@ -7,6 +7,38 @@ import { taskAPI, chatAPI, automationAPI } from './services/api';
 import { Task, ChatMessage, AutomationStatus } from './types';
 import { Cog6ToothIcon } from '@heroicons/react/24/outline';
 
+// Each browser session has its own conversation, kept across reloads of the tab
+const getConversationId = (): string => {
+  let id = sessionStorage.getItem('conversationId');
+  if (!id) {
+    // randomUUID is only available on secure origins, and the app is often served over plain HTTP
+    id = typeof crypto.randomUUID === 'function'
+      ? crypto.randomUUID()
+      : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+    sessionStorage.setItem('conversationId', id);
+  }
+  return id;
+};
+
+const conversationId = getConversationId();
+
+// The board loads every task, in the largest pages the API serves
+const TASK_PAGE_SIZE = 1000;
+
+// Frames from other sessions' conversations are not ours to show
+const isOtherConversation = (id?: string) => id !== undefined && id !== conversationId;
+
+// What the board renders: every task, the automation status and this session's chat,
+// so the server skips other sessions' chat messages and streamed replies
+const BOARD_TOPICS = [
+  'type:task_created',
+  'type:task_updated',
+  'type:task_deleted',
+  'type:tasks_changed',
+  'status',
+  `conversation:${conversationId}`,
+];
+
 function App() {
   const [tasks, setTasks] = useState<Task[]>([]);
   const [chatMessages, setChatMessages] = useState<ChatMessage[]>([]);
@@ -17,8 +49,9 @@ function App() {
   });
   const [isProcessingMessage, setIsProcessingMessage] = useState(false);
   const [selectedTask, setSelectedTask] = useState<Task | null>(null);
+  const taskSyncPoint = useRef<{ version: number; epoch: string } | null>(null);
 
-  const { subscribe, unsubscribe } = useWebSocket();
+  const { subscribe, unsubscribe, subscribeTopics, unsubscribeTopics } = useWebSocket();
 
   useEffect(() => {
     // Load initial data
@@ -39,8 +72,41 @@ function App() {
       setTasks(prev => prev.filter(t => t.id !== data.task_id));
     };
 
+    const handleTasksChanged = (changes: { created: Task[]; updated: Task[]; deleted: string[]; archived?: string[] }) => {
+      const changed = new Map([...changes.created, ...changes.updated].map(task => [task.id, task]));
+      // Archived tasks leave the live list too; they can still be fetched by ID
+      const deleted = new Set([...changes.deleted, ...(changes.archived || [])]);
+      setTasks(prev => {
+        const kept = prev
+          .filter(task => !deleted.has(task.id))
+          .map(task => changed.get(task.id) || task);
+        const known = new Set(kept.map(task => task.id));
+        return [...kept, ...changes.created.filter(task => !known.has(task.id))];
+      });
+    };
+
     const handleChatMessage = (message: ChatMessage) => {
-      setChatMessages(prev => [...prev, message]);
+      if (isOtherConversation(message.conversation_id)) {
+        return;
+      }
+      // A streamed reply is already on screen as a draft; the final message replaces it
+      setChatMessages(prev =>
+        prev.some(m => m.id === message.id)
+          ? prev.map(m => m.id === message.id ? message : m)
+          : [...prev, message]
+      );
+    };
+
+    const handleChatDelta = (delta: { id: string; conversation_id?: string; delta: string }) => {
+      if (isOtherConversation(delta.conversation_id)) {
+        return;
+      }
+      setChatMessages(prev => {
+        if (!prev.some(m => m.id === delta.id)) {
+          return [...prev, { id: delta.id, type: 'assistant', content: delta.delta, timestamp: new Date().toISOString() }];
+        }
+        return prev.map(m => m.id === delta.id ? { ...m, content: m.content + delta.delta } : m);
+      });
     };
 
     const handleStatusUpdate = (status: AutomationStatus) => {
@@ -55,37 +121,86 @@ function App() {
       setAutomationStatus(status);
     };
 
+    const handleReconnected = () => {
+      syncTaskChanges();
+    };
+
+    subscribeTopics(BOARD_TOPICS);
     subscribe('task_created', handleTaskCreated);
     subscribe('task_updated', handleTaskUpdated);
     subscribe('task_deleted', handleTaskDeleted);
+    subscribe('tasks_changed', handleTasksChanged);
     subscribe('chat_message', handleChatMessage);
+    subscribe('chat_delta', handleChatDelta);
     subscribe('status_update', handleStatusUpdate);
     subscribe('automation_started', handleAutomationStarted);
     subscribe('automation_stopped', handleAutomationStopped);
+    subscribe('reconnected', handleReconnected);
 
     return () => {
       unsubscribe('task_created', handleTaskCreated);
       unsubscribe('task_updated', handleTaskUpdated);
       unsubscribe('task_deleted', handleTaskDeleted);
+      unsubscribe('tasks_changed', handleTasksChanged);
       unsubscribe('chat_message', handleChatMessage);
+      unsubscribe('chat_delta', handleChatDelta);
       unsubscribe('status_update', handleStatusUpdate);
       unsubscribe('automation_started', handleAutomationStarted);
       unsubscribe('automation_stopped', handleAutomationStopped);
+      unsubscribe('reconnected', handleReconnected);
+      unsubscribeTopics(BOARD_TOPICS);
     };
-  }, [subscribe, unsubscribe]);
+  }, [subscribe, unsubscribe, subscribeTopics, unsubscribeTopics]);
 
   const loadTasks = async () => {
     try {
-      const tasks = await taskAPI.getTasks();
-      setTasks(tasks);
+      const first = await taskAPI.getTaskPage({ limit: TASK_PAGE_SIZE });
+      const loaded = new Map(first.tasks.map(task => [task.id, task]));
+      let cursor = first.next_cursor;
+      while (cursor) {
+        const page = await taskAPI.getTaskPage({ cursor, limit: TASK_PAGE_SIZE });
+        page.tasks.forEach(task => loaded.set(task.id, task));
+        cursor = page.next_cursor;
+      }
+      taskSyncPoint.current = { version: first.version, epoch: first.epoch };
+      setTasks(Array.from(loaded.values()));
+      // Tasks that changed while later pages were loading moved ahead of the cursor;
+      // the changes feed since the first page brings them in
+      if (first.next_cursor) {
+        await syncTaskChanges();
+      }
     } catch (error) {
       console.error('Failed to load tasks:', error);
     }
   };
 
+  const syncTaskChanges = async () => {
+    if (!taskSyncPoint.current) {
+      return loadTasks();
+    }
+    try {
+      const changes = await taskAPI.getChanges(taskSyncPoint.current.version, taskSyncPoint.current.epoch);
+      if (changes.reset) {
+        return loadTasks();
+      }
+      taskSyncPoint.current = { version: changes.version, epoch: changes.epoch };
+      const changed = new Map(changes.tasks.map(task => [task.id, task]));
+      const deleted = new Set(changes.deleted.map(tombstone => tombstone.id));
+      setTasks(prev => {
+        const kept = prev
+          .filter(task => !deleted.has(task.id))
+          .map(task => changed.get(task.id) || task);
+        const known = new Set(kept.map(task => task.id));
+        return [...kept, ...changes.tasks.filter(task => !known.has(task.id))];
+      });
+    } catch (error) {
+      console.error('Failed to sync task changes:', error);
+    }
+  };
+
   const loadChatMessages = async () => {
     try {
-      const messages = await chatAPI.getMessages();
+      const messages = await chatAPI.getMessages(conversationId);
       setChatMessages(messages);
     } catch (error) {
       console.error('Failed to load chat messages:', error);
@@ -104,7 +219,7 @@ function App() {
   const handleSendMessage = async (message: string) => {
     setIsProcessingMessage(true);
     try {
-      await chatAPI.createTaskFromMessage({ message });
+      await chatAPI.createTaskFromMessage({ message, conversation_id: conversationId });
     } catch (error) {
       console.error('Failed to send message:', error);
     } finally {
@@ -52,9 +52,20 @@ export const useWebSocket = () => {
     webSocketService.send(message);
   }, []);
 
+  // Narrow the server's event stream to these topics (see WebSocketService.subscribe)
+  const subscribeTopics = useCallback((topics: string[]) => {
+    webSocketService.subscribe(topics);
+  }, []);
+
+  const unsubscribeTopics = useCallback((topics: string[]) => {
+    webSocketService.unsubscribe(topics);
+  }, []);
+
   return {
     subscribe,
     unsubscribe,
+    subscribeTopics,
+    unsubscribeTopics,
     send,
     isConnected: isConnected.current
   };
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { Task, TaskCreationRequest, ChatMessage, AutomationStatus } from '../types';
+import { Task, TaskQuery, TaskPage, TaskChanges, TaskSearchResult, TaskCreationRequest, ChatMessage, ChatMessagePage, AutomationStatus } from '../types';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://192.168.1.13:8009/api';
 
@@ -11,12 +11,30 @@ const api = axios.create({
 });
 
 export const taskAPI = {
-  // Get all tasks
-  getTasks: async (): Promise<Task[]> => {
-    const response = await api.get('/tasks');
+  // Get the most recently updated tasks (first page)
+  getTasks: async (query: TaskQuery = {}): Promise<Task[]> => {
+    const response = await api.get('/tasks', { params: query });
     return response.data.tasks;
   },
 
+  // Get one page of tasks; pass next_cursor back to continue
+  getTaskPage: async (query: TaskQuery = {}): Promise<TaskPage> => {
+    const response = await api.get('/tasks', { params: query });
+    return response.data;
+  },
+
+  // Get tasks changed since a store version (reset=true means a full reload is needed)
+  getChanges: async (since: number, epoch?: string): Promise<TaskChanges> => {
+    const response = await api.get('/tasks/changes', { params: { since, epoch } });
+    return response.data;
+  },
+
+  // Full-text search over tasks (including archived ones), best match first
+  searchTasks: async (q: string, limit?: number): Promise<TaskSearchResult[]> => {
+    const response = await api.get('/tasks/search', { params: { q, limit } });
+    return response.data.results;
+  },
+
   // Get specific task
   getTask: async (taskId: string): Promise<Task> => {
     const response = await api.get(`/tasks/${taskId}`);
@@ -39,6 +57,23 @@ export const taskAPI = {
   deleteTask: async (taskId: string): Promise<void> => {
     await api.delete(`/tasks/${taskId}`);
   },
+
+  // Create many tasks in one request
+  createTasks: async (tasks: Partial<Task>[]): Promise<Task[]> => {
+    const response = await api.post('/tasks/bulk', { tasks });
+    return response.data.tasks;
+  },
+
+  // Update many tasks in one request
+  updateTasks: async (updates: (Partial<Task> & { id: string })[]): Promise<Task[]> => {
+    const response = await api.patch('/tasks/bulk', { updates });
+    return response.data.tasks;
+  },
+
+  // Delete many tasks in one request
+  deleteTasks: async (ids: string[]): Promise<void> => {
+    await api.delete('/tasks/bulk', { data: { ids } });
+  },
 };
 
 export const chatAPI = {
@@ -47,6 +82,7 @@ export const chatAPI = {
     message: ChatMessage;
     conversation_continues: boolean;
     tasks_created?: number;
+    analysis_pending?: boolean;
     analysis?: string;
   }> => {
     const response = await api.post('/chat/message', request);
@@ -58,17 +94,24 @@ export const chatAPI = {
     message: ChatMessage;
     conversation_continues: boolean;
     tasks_created?: number;
+    analysis_pending?: boolean;
     analysis?: string;
   }> => {
     const response = await api.post('/chat/create-task', request);
     return response.data;
   },
 
-  // Get chat message history
-  getMessages: async (): Promise<ChatMessage[]> => {
-    const response = await api.get('/chat/messages');
+  // Get the latest page of a conversation's history
+  getMessages: async (conversationId?: string): Promise<ChatMessage[]> => {
+    const response = await api.get('/chat/messages', { params: { conversation_id: conversationId } });
     return response.data.messages;
   },
+
+  // Get a page of a conversation's history older than a seq; pass next_before back to go further
+  getMessagePage: async (before?: number, limit?: number, conversationId?: string): Promise<ChatMessagePage> => {
+    const response = await api.get('/chat/messages', { params: { conversation_id: conversationId, before, limit } });
+    return response.data;
+  },
 };
 
 export const automationAPI = {
@@ -98,9 +141,25 @@ export class WebSocketService {
   private reconnectAttempts = 0;
   private maxReconnectAttempts = 5;
   private reconnectDelay = 1000;
+  private hasConnected = false;
+  // Topics this client narrowed the stream to; empty means every event
+  private topics = new Set<string>();
+  // Position in the server's event stream, so a reconnect only replays what we missed
+  private streamId: string | null = null;
+  private lastSeq = 0;
 
   connect() {
-    const wsUrl = process.env.REACT_APP_WS_URL || 'ws://192.168.1.13:8009/ws';
+    const baseUrl = process.env.REACT_APP_WS_URL || 'ws://192.168.1.13:8009/ws';
+    const params = new URLSearchParams();
+    if (this.topics.size > 0) {
+      params.set('topics', Array.from(this.topics).join(','));
+    }
+    if (this.streamId) {
+      params.set('stream', this.streamId);
+      params.set('last_seq', String(this.lastSeq));
+    }
+    const query = params.toString();
+    const wsUrl = query ? `${baseUrl}${baseUrl.includes('?') ? '&' : '?'}${query}` : baseUrl;
     
     try {
       this.ws = new WebSocket(wsUrl);
@@ -108,13 +167,29 @@ export class WebSocketService {
       this.ws.onopen = () => {
         console.log('WebSocket connected');
         this.reconnectAttempts = 0;
+        // Topics added while the socket was still connecting were not in the URL
+        if (this.topics.size > 0) {
+          this.send({ type: 'subscribe', topics: Array.from(this.topics) });
+        }
         this.emit('connected', null);
       };
 
       this.ws.onmessage = (event) => {
         try {
           const message = JSON.parse(event.data);
-          this.emit(message.type, message.data);
+          if (message.type === 'hello') {
+            this.handleHello(message.data);
+            return;
+          }
+          // Events gathered over one coalescing window arrive together; React
+          // batches the state updates they cause into a single render
+          const events = message.type === 'batch' ? message.data : [message];
+          for (const inner of events) {
+            if (typeof inner.seq === 'number' && inner.seq > this.lastSeq) {
+              this.lastSeq = inner.seq;
+            }
+            this.emit(inner.type, inner.data);
+          }
         } catch (error) {
           console.error('Failed to parse WebSocket message:', error);
         }
@@ -136,6 +211,20 @@ export class WebSocketService {
     }
   }
 
+  private handleHello(hello: { stream_id: string; seq: number; resumed: boolean }) {
+    this.streamId = hello.stream_id;
+    if (!hello.resumed) {
+      this.lastSeq = hello.seq;
+      // The events sent while we were away are no longer buffered (or the server
+      // restarted); let listeners catch up via delta sync
+      if (this.hasConnected) {
+        this.emit('reconnected', null);
+      }
+    }
+    // When resumed, the missed events follow this frame
+    this.hasConnected = true;
+  }
+
   private attemptReconnect() {
     if (this.reconnectAttempts < this.maxReconnectAttempts) {
       this.reconnectAttempts++;
@@ -173,6 +262,23 @@ export class WebSocketService {
     }
   }
 
+  // Only receive events for these topics (plus any already subscribed):
+  // "status", "task:<id>", "type:<event type>" or "conversation:<id>"
+  subscribe(topics: string[]) {
+    topics.forEach(topic => this.topics.add(topic));
+    this.send({ type: 'subscribe', topics });
+  }
+
+  // Stop receiving these topics; with no topics, go back to every event
+  unsubscribe(topics?: string[]) {
+    if (topics) {
+      topics.forEach(topic => this.topics.delete(topic));
+    } else {
+      this.topics.clear();
+    }
+    this.send({ type: 'unsubscribe', topics });
+  }
+
   send(message: any) {
     if (this.ws && this.ws.readyState === WebSocket.OPEN) {
       this.ws.send(JSON.stringify(message));
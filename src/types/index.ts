@@ -10,6 +10,45 @@ export interface Task {
   updated_at: string;
   duration?: string;
   iterations?: number;
+  output?: string;
+  conversation_id?: string;
+}
+
+export interface TaskQuery {
+  status?: string;
+  priority?: string;
+  updated_after?: string;
+  updated_before?: string;
+  cursor?: string;
+  limit?: number;
+}
+
+export interface TaskPage {
+  tasks: Task[];
+  next_cursor: string | null;
+  version: number;
+  epoch: string;
+}
+
+export interface TaskTombstone {
+  id: string;
+  version: number;
+  deleted_at: string;
+  archived: boolean;
+}
+
+export interface TaskChanges {
+  reset: boolean;
+  tasks: Task[];
+  deleted: TaskTombstone[];
+  version: number;
+  epoch: string;
+}
+
+export interface TaskSearchResult {
+  task: Task;
+  score: number;
+  archived: boolean;
 }
 
 export interface ChatMessage {
@@ -18,6 +57,14 @@ export interface ChatMessage {
   content: string;
   timestamp: string;
   task_id?: string;
+  seq?: number;
+  conversation_id?: string;
+}
+
+export interface ChatMessagePage {
+  conversation_id: string;
+  messages: ChatMessage[];
+  next_before: number | null;
 }
 
 export interface AutomationStatus {
@@ -31,6 +78,7 @@ export interface AutomationStatus {
 export interface TaskCreationRequest {
   message: string;
   context?: string;
+  conversation_id?: string;
 }
 
 export interface TaskCreationResponse {
@@ -0,0 +1,203 @@
+"""
+Cold storage for finished tasks
+Terminal tasks are appended in compressed blocks to segment files, with a small offset index per segment
+"""
+
+import json
+import logging
+import lzma
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not on Windows; writers are then only serialized per process
+    fcntl = None
+
+from task_models import Task, serialize_task
+
+logger = logging.getLogger(__name__)
+
+# Segment files roll over once they reach this many bytes
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+
+# Tasks compressed together; bigger blocks compress better but cost more to read one task back
+ARCHIVE_BLOCK_SIZE = 64
+
+# Decompressed blocks kept for repeated lookups
+BLOCK_CACHE_SIZE = 32
+
+# A lookup that misses re-reads the indexes for other processes' writes at most this often (seconds)
+MISS_REFRESH_INTERVAL = 1.0
+
+LOCK_FILE = "archive.lock"
+
+CODECS = {
+    "zlib": (lambda data: zlib.compress(data, 9), zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+
+class TaskArchive:
+    """Append-only archive of task records in compressed segment files
+
+    Each segment (segment-00000001.zlib) is a sequence of compressed blocks, every block
+    a JSON list of serialized tasks. Its index (segment-00000001.idx) has one
+    "task_id offset length" line per task, so a lookup reads and inflates a single block.
+    The codec is part of the segment name, so switching codecs keeps old segments readable.
+    Files are only ever appended to; writers in different processes take turns through
+    an advisory lock on archive.lock, and a writer's own index is current as soon as
+    append() returns. Readers pick up other processes' index lines on a miss, at most
+    once per MISS_REFRESH_INTERVAL, since most misses are tasks that were never archived.
+    """
+
+    def __init__(self, directory: str, compression: str = "zlib", segment_size: int = DEFAULT_SEGMENT_SIZE):
+        if compression not in CODECS:
+            raise ValueError(f"Unknown archive compression: {compression}")
+        self.directory = directory
+        self.compression = compression
+        self.segment_size = segment_size
+        self.lock = threading.RLock()
+        # Task ID -> (segment name, block offset, block length); later entries win
+        self.index: Dict[str, Tuple[str, int, int]] = {}
+        # Index file name -> bytes of it already loaded
+        self._index_offsets: Dict[str, int] = {}
+        self._refreshed_at = 0.0
+        self._read_block = lru_cache(maxsize=BLOCK_CACHE_SIZE)(self._read_block_uncached)
+        os.makedirs(directory, exist_ok=True)
+        self.refresh()
+        logger.info(f"Task archive opened at {directory} with {len(self.index)} tasks")
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, task_id: str) -> bool:
+        return self._locate(task_id) is not None
+
+    def get(self, task_id: str) -> Optional[Task]:
+        """Get an archived task by ID"""
+        location = self._locate(task_id)
+        if location is None:
+            return None
+        for data in self._read_block(*location):
+            if data["id"] == task_id:
+                return Task.from_dict(data)
+        return None
+
+    def iter_tasks(self) -> Iterator[Task]:
+        """Yield every archived task, oldest archive first (a task archived twice is yielded once)"""
+        with self.lock:
+            self.refresh()
+            index = dict(self.index)
+        for location in sorted(set(index.values())):
+            for data in self._read_block(*location):
+                if index.get(data["id"]) == location:
+                    yield Task.from_dict(data)
+
+    def append(self, tasks: List[Task]):
+        """Write tasks to the current segment and index them, flushed to disk before returning"""
+        if not tasks:
+            return
+        compress = CODECS[self.compression][0]
+        with self.lock, self._exclusive():
+            self.refresh()
+            segment = self._writable_segment()
+            index_lines = []
+            with open(os.path.join(self.directory, segment), "ab") as f:
+                for start in range(0, len(tasks), ARCHIVE_BLOCK_SIZE):
+                    block = tasks[start:start + ARCHIVE_BLOCK_SIZE]
+                    payload = compress(json.dumps([serialize_task(task) for task in block]).encode())
+                    offset = f.seek(0, os.SEEK_END)
+                    f.write(payload)
+                    index_lines.extend(f"{task.id} {offset} {len(payload)}\n" for task in block)
+                f.flush()
+                os.fsync(f.fileno())
+
+            # The index is written only after its blocks are durable, so it never points at missing data
+            with open(os.path.join(self.directory, self._index_name(segment)), "a") as f:
+                f.write("".join(index_lines))
+                f.flush()
+                os.fsync(f.fileno())
+            self.refresh()
+
+    def refresh(self):
+        """Load index lines appended since the last refresh (possibly by other processes)"""
+        with self.lock:
+            self._refreshed_at = time.monotonic()
+            for segment in self._segments():
+                name = self._index_name(segment)
+                path = os.path.join(self.directory, name)
+                loaded = self._index_offsets.get(name, 0)
+                try:
+                    if os.path.getsize(path) == loaded:
+                        continue
+                    with open(path, "rb") as f:
+                        f.seek(loaded)
+                        data = f.read()
+                except FileNotFoundError:
+                    continue
+
+                # A writer may be mid-line; leave the partial line for the next refresh
+                complete = data[:data.rfind(b"\n") + 1]
+                for line in complete.decode().splitlines():
+                    task_id, offset, length = line.split()
+                    self.index[task_id] = (segment, int(offset), int(length))
+                self._index_offsets[name] = loaded + len(complete)
+
+    # Internals
+
+    def _locate(self, task_id: str) -> Optional[Tuple[str, int, int]]:
+        with self.lock:
+            location = self.index.get(task_id)
+            if location is None and time.monotonic() - self._refreshed_at >= MISS_REFRESH_INTERVAL:
+                self.refresh()
+                location = self.index.get(task_id)
+            return location
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the cross-process writer lock"""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, LOCK_FILE), "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _segments(self) -> List[str]:
+        """Segment file names in write order"""
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith("segment-") and name.rsplit(".", 1)[-1] in CODECS
+        )
+
+    def _writable_segment(self) -> str:
+        segments = self._segments()
+        if segments:
+            latest = segments[-1]
+            number = int(latest[len("segment-"):].split(".", 1)[0])
+            size = os.path.getsize(os.path.join(self.directory, latest))
+            if latest.endswith(f".{self.compression}") and size < self.segment_size:
+                return latest
+            number += 1
+        else:
+            number = 1
+        return f"segment-{number:08d}.{self.compression}"
+
+    @staticmethod
+    def _index_name(segment: str) -> str:
+        return segment.rsplit(".", 1)[0] + ".idx"
+
+    def _read_block_uncached(self, segment: str, offset: int, length: int) -> List[Dict]:
+        decompress = CODECS[segment.rsplit(".", 1)[-1]][1]
+        with open(os.path.join(self.directory, segment), "rb") as f:
+            f.seek(offset)
+            return json.loads(decompress(f.read(length)))
@@ -0,0 +1,233 @@
+"""
+Compact task records for the task store
+Tasks are kept as slotted objects with epoch timestamps and small integer codes,
+and are only turned into the JSON shape the API exposes at the edge
+"""
+
+import math
+import time
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+# Serialized dicts kept for recently served task records
+SERIALIZER_CACHE_SIZE = 4096
+
+
+class Codebook:
+    """Two-way mapping between names and small integer codes"""
+
+    def __init__(self, names: Iterable[str]):
+        self.names: List[str] = list(names)
+        self.codes: Dict[str, int] = {name: code for code, name in enumerate(self.names)}
+
+    def __contains__(self, name) -> bool:
+        return name in self.codes
+
+    def code(self, name: str) -> int:
+        """Get the code for a known name; raises ValueError for any other"""
+        code = self.codes.get(name)
+        if code is None:
+            raise ValueError(f"Unknown value: {name!r}")
+        return code
+
+    def register(self, name: str) -> int:
+        """Get the code for a name, registering it if it is new
+
+        Only for names read back from storage (records written before values were
+        validated), so those round-trip; the codebook stays bounded by what is stored.
+        """
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def lookup(self, name: str) -> Optional[int]:
+        """Get the code for a name without registering it"""
+        return self.codes.get(name)
+
+    def name(self, code: int) -> str:
+        return self.names[code]
+
+
+STATUS = Codebook(["pending", "in_progress", "completed", "failed"])
+# Ordered by urgency, so the code doubles as the priority rank
+PRIORITY = Codebook(["critical", "high", "medium", "low"])
+
+PENDING = STATUS.code("pending")
+MEDIUM = PRIORITY.code("medium")
+
+
+@lru_cache(maxsize=SERIALIZER_CACHE_SIZE)
+def _iso_second(second: int) -> str:
+    return datetime.fromtimestamp(second).isoformat()
+
+
+def to_iso(timestamp: float) -> str:
+    """Format epoch seconds the way the API has always exposed timestamps
+
+    Tasks are created and updated in bursts, so the date/time part is cached per whole
+    second and only the microseconds are formatted on every call.
+    """
+    second = int(timestamp)
+    micros = round((timestamp - second) * 1_000_000)
+    if micros >= 1_000_000:
+        second, micros = second + 1, 0
+    if micros:
+        return f"{_iso_second(second)}.{micros:06d}"
+    return _iso_second(second)
+
+
+def parse_timestamp(value, default: Optional[float] = None) -> float:
+    """Convert an ISO timestamp or epoch seconds (number or numeric string) to epoch seconds
+
+    Raises ValueError for anything else, unless a default is given to fall back to.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            seconds = float(value)
+        except ValueError:
+            pass
+        else:
+            if math.isfinite(seconds):
+                return seconds
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            pass
+    if default is not None:
+        return default
+    raise ValueError(f"Invalid timestamp: {value!r}")
+
+
+class Task:
+    """A task record; instances are never modified in place, use updated() instead"""
+
+    __slots__ = (
+        "id",
+        "title",
+        "description",
+        "requirements",
+        "acceptance_criteria",
+        "priority",
+        "status",
+        "created_at",
+        "updated_at",
+        "extra",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        title: str,
+        description: str,
+        requirements: tuple = (),
+        acceptance_criteria: tuple = (),
+        priority: int = MEDIUM,
+        status: int = PENDING,
+        created_at: float = 0.0,
+        updated_at: float = 0.0,
+        extra: Optional[Dict] = None,
+    ):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.requirements = requirements
+        self.acceptance_criteria = acceptance_criteria
+        self.priority = priority
+        self.status = status
+        self.created_at = created_at
+        self.updated_at = updated_at
+        # Fields outside the core schema (rare), kept so they survive a round trip
+        self.extra = extra
+
+    @classmethod
+    def new(cls, task_data: Dict) -> "Task":
+        """Create a fresh pending task from API input"""
+        now = time.time()
+        return cls(
+            id=str(uuid.uuid4()),
+            title=task_data["title"],
+            description=task_data["description"],
+            requirements=tuple(task_data.get("requirements", ())),
+            acceptance_criteria=tuple(task_data.get("acceptance_criteria", ())),
+            priority=PRIORITY.code(task_data.get("priority", "medium")),
+            status=PENDING,
+            created_at=now,
+            updated_at=now,
+            # Tasks proposed in a chat remember it, so their results are reported there
+            extra={"conversation_id": task_data["conversation_id"]} if task_data.get("conversation_id") else None,
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Task":
+        """Build a record from the JSON shape produced by serialize_task"""
+        task = cls(id=data["id"], title=data.get("title", ""), description=data.get("description", ""))
+        # Records from older versions may lack timestamps; they count as created now
+        now = time.time()
+        task.created_at = parse_timestamp(data.get("created_at"), now)
+        task.updated_at = parse_timestamp(data.get("updated_at", data.get("created_at")), now)
+        task._set_fields({key: value for key, value in data.items() if key not in ("created_at", "updated_at")}, stored=True)
+        return task
+
+    def updated(self, fields: Dict) -> "Task":
+        """Get a copy with JSON-shaped fields applied and updated_at set to now"""
+        task = Task.__new__(Task)
+        for slot in Task.__slots__:
+            setattr(task, slot, getattr(self, slot))
+        task._set_fields(fields)
+        task.updated_at = time.time()
+        return task
+
+    def _set_fields(self, fields: Dict, stored: bool = False):
+        for key, value in fields.items():
+            if key == "status":
+                self.status = STATUS.register(value) if stored else STATUS.code(value)
+            elif key == "priority":
+                self.priority = PRIORITY.register(value) if stored else PRIORITY.code(value)
+            elif key in ("requirements", "acceptance_criteria"):
+                setattr(self, key, tuple(value))
+            elif key in ("title", "description"):
+                setattr(self, key, value)
+            elif key == "created_at":
+                self.created_at = parse_timestamp(value, self.created_at)
+            elif key not in ("id", "updated_at"):
+                self.extra = {**(self.extra or {}), key: value}
+
+    @property
+    def status_name(self) -> str:
+        return STATUS.names[self.status]
+
+    @property
+    def priority_name(self) -> str:
+        return PRIORITY.names[self.priority]
+
+    def to_dict(self) -> Dict:
+        return serialize_task(self)
+
+
+@lru_cache(maxsize=SERIALIZER_CACHE_SIZE)
+def serialize_task(task: Task) -> Dict:
+    """Convert a record to the API's JSON shape
+
+    Records are immutable and hash by identity, so the result can be cached per record;
+    callers must treat the returned dict as read-only.
+    """
+    data = {
+        "id": task.id,
+        "title": task.title,
+        "description": task.description,
+        "requirements": list(task.requirements),
+        "acceptance_criteria": list(task.acceptance_criteria),
+        "priority": PRIORITY.names[task.priority],
+        "status": STATUS.names[task.status],
+        "created_at": to_iso(task.created_at),
+        "updated_at": to_iso(task.updated_at),
+    }
+    if task.extra:
+        data.update(task.extra)
+    return data
@@ -0,0 +1,137 @@
+"""
+Task indexes used by the task store
+Keeps task IDs bucketed by status and sorted by update time, and orders pending work by priority with aging
+"""
+
+import bisect
+import heapq
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from task_models import Task
+
+# Seconds of waiting that make up for one step of priority
+DEFAULT_AGING_INTERVAL = 600.0
+
+
+class StatusIndex:
+    """Task IDs bucketed by status, kept current by every status transition"""
+
+    def __init__(self):
+        self.buckets: Dict[int, Set[str]] = defaultdict(set)
+        self.status_of: Dict[str, int] = {}
+
+    def update(self, task_id: str, status: Optional[int]):
+        """Move a task to the bucket for its new status (None removes it)"""
+        previous = self.status_of.get(task_id)
+        if previous == status:
+            return
+        if previous is not None:
+            self.buckets[previous].discard(task_id)
+            del self.status_of[task_id]
+        if status is not None:
+            self.buckets[status].add(task_id)
+            self.status_of[task_id] = status
+
+    def ids(self, status: int) -> Set[str]:
+        """Get the IDs of all tasks with the given status"""
+        return self.buckets.get(status, set())
+
+    def counts(self) -> Dict[int, int]:
+        """Get the number of tasks per status"""
+        return {status: len(ids) for status, ids in self.buckets.items() if ids}
+
+    def clear(self):
+        self.buckets.clear()
+        self.status_of.clear()
+
+
+class UpdatedAtIndex:
+    """Task IDs sorted by (updated_at, id), used for cursor pagination"""
+
+    def __init__(self):
+        self.keys: List[Tuple[float, str]] = []
+        self.key_of: Dict[str, Tuple[float, str]] = {}
+
+    def update(self, task_id: str, updated_at: Optional[float]):
+        """Re-position a task after its updated_at changed (None removes it)"""
+        previous = self.key_of.pop(task_id, None)
+        if previous is not None:
+            position = bisect.bisect_left(self.keys, previous)
+            if position < len(self.keys) and self.keys[position] == previous:
+                del self.keys[position]
+        if updated_at is not None:
+            key = (updated_at, task_id)
+            bisect.insort(self.keys, key)
+            self.key_of[task_id] = key
+
+    def iter_desc(self, before: Optional[Tuple[float, str]] = None) -> Iterator[Tuple[float, str]]:
+        """Yield keys newest first, starting strictly below the given key"""
+        end = len(self.keys) if before is None else bisect.bisect_left(self.keys, before)
+        for position in range(end - 1, -1, -1):
+            yield self.keys[position]
+
+    def iter_asc(self, before: float) -> Iterator[Tuple[float, str]]:
+        """Yield keys oldest first, up to (excluding) the given updated_at"""
+        end = bisect.bisect_left(self.keys, (before, ""))
+        for position in range(end):
+            yield self.keys[position]
+
+    def clear(self):
+        self.keys = []
+        self.key_of = {}
+
+
+class PendingTaskQueue:
+    """Min-heap of pending tasks ordered by (priority, created_at) with aging
+
+    Priority is expressed as a head start in seconds: the sort key is the creation time
+    plus aging_interval for every step below critical (the priority code is its rank).
+    A low priority task therefore overtakes newer critical work once it has waited
+    three aging intervals, so nothing starves while the heap keys stay static. Removals
+    are lazy: stale heap entries are skipped on peek and compacted away when they start
+    to dominate.
+    """
+
+    def __init__(self, aging_interval: float = DEFAULT_AGING_INTERVAL):
+        self.aging_interval = aging_interval
+        self.heap: List[Tuple[float, str]] = []
+        self.keys: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def sort_key(self, task: Task) -> float:
+        return task.created_at + task.priority * self.aging_interval
+
+    def push(self, task: Task):
+        """Add a pending task, or re-key it if its priority changed"""
+        key = self.sort_key(task)
+        if self.keys.get(task.id) == key:
+            return
+        self.keys[task.id] = key
+        heapq.heappush(self.heap, (key, task.id))
+        self._maybe_compact()
+
+    def discard(self, task_id: str):
+        """Forget a task that is no longer pending"""
+        if self.keys.pop(task_id, None) is not None:
+            self._maybe_compact()
+
+    def peek(self) -> Optional[str]:
+        """Get the ID of the most urgent pending task without removing it"""
+        while self.heap:
+            key, task_id = self.heap[0]
+            if self.keys.get(task_id) == key:
+                return task_id
+            heapq.heappop(self.heap)
+        return None
+
+    def clear(self):
+        self.heap = []
+        self.keys = {}
+
+    def _maybe_compact(self):
+        if len(self.heap) > 2 * len(self.keys) + 64:
+            self.heap = [(key, task_id) for task_id, key in self.keys.items()]
+            heapq.heapify(self.heap)
@@ -0,0 +1,752 @@
+"""
+Task storage backends for the Claude Code Automation API
+Provides a pluggable task repository with an in-memory backend and a durable SQLite backend
+"""
+
+import base64
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Collection, Dict, List, Optional, Tuple
+
+from task_archive import TaskArchive
+from task_models import PENDING, PRIORITY, STATUS, Task, serialize_task, to_iso
+from search_index import TaskSearchIndex
+from task_queue import DEFAULT_AGING_INTERVAL, PendingTaskQueue, StatusIndex, UpdatedAtIndex
+
+logger = logging.getLogger(__name__)
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
+CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks(priority);
+CREATE INDEX IF NOT EXISTS idx_tasks_updated_at ON tasks(updated_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_version ON tasks(version);
+CREATE TABLE IF NOT EXISTS task_tombstones (
+    id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    deleted_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_task_tombstones_version ON task_tombstones(version);
+CREATE INDEX IF NOT EXISTS idx_task_tombstones_deleted_at ON task_tombstones(deleted_at);
+CREATE TABLE IF NOT EXISTS task_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_task_outbox_next_attempt ON task_outbox(next_attempt_at);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO store_meta (key, value) VALUES ('version', 0);
+INSERT OR IGNORE INTO store_meta (key, value) VALUES ('purged_version', 0);
+INSERT OR IGNORE INTO store_meta (key, value) VALUES ('epoch', abs(random()));
+"""
+
+# How long deletions stay visible to delta-sync clients, in seconds
+DEFAULT_TOMBSTONE_RETENTION = 24 * 60 * 60
+
+# Minimum seconds between sweeps for expired tombstones
+TOMBSTONE_PURGE_INTERVAL = 60
+
+# Completed/failed tasks untouched for this many seconds move to the archive
+DEFAULT_ARCHIVE_AFTER = 7 * 24 * 60 * 60
+
+# Most tasks moved to the archive per store transaction
+ARCHIVE_BATCH_SIZE = 1000
+
+TERMINAL_STATUSES = frozenset({STATUS.code("completed"), STATUS.code("failed")})
+
+# Pages are walked newest first; a status filter this selective sorts its own bucket instead
+SELECTIVE_FILTER_RATIO = 8
+
+
+def encode_cursor(key: Tuple[float, str]) -> str:
+    """Encode an (updated_at, id) pagination key as an opaque cursor"""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """Decode a cursor produced by encode_cursor, raising ValueError if it is malformed"""
+    try:
+        updated_at, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        updated_at = float(updated_at)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(task_id, str) or not math.isfinite(updated_at):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return updated_at, task_id
+
+
+class InMemoryTaskStore:
+    """Task repository backed by a plain dict (used for tests and single-process runs)
+
+    Tasks are stored as immutable Task records: every write replaces the record,
+    so callers can hold on to a task they read without seeing it change underneath them.
+    Filters and counts speak status/priority names; records carry their integer codes.
+    With an archive attached, old finished tasks leave the hot set (and the indexes) but
+    can still be read back by ID.
+    """
+
+    def __init__(
+        self,
+        aging_interval: float = DEFAULT_AGING_INTERVAL,
+        tombstone_retention: float = DEFAULT_TOMBSTONE_RETENTION,
+        archive: Optional[TaskArchive] = None,
+    ):
+        self.tasks: Dict[str, Task] = {}
+        self.archive = archive
+        self.version = 0
+        self.epoch = uuid.uuid4().hex[:8]
+        self.lock = threading.RLock()
+        self.status_index = StatusIndex()
+        self.updated_index = UpdatedAtIndex()
+        self.pending_queue = PendingTaskQueue(aging_interval)
+        # Built outside the lock (at startup, or on the first search), then kept current
+        # by every committed change
+        self.search_index: Optional[TaskSearchIndex] = None
+        self._search_build_lock = threading.Lock()
+        # Bumped whenever the cache is reloaded, so an index built from the old one is discarded
+        self._generation = 0
+        # Task ID -> version of its last change, oldest change first
+        self.change_log: "OrderedDict[str, int]" = OrderedDict()
+        # Task ID -> (version, deleted_at) for deletions still inside the retention window
+        self.tombstones: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+        self.tombstone_retention = tombstone_retention
+        self.purged_version = 0
+        self._last_purge = 0.0
+        self._staged: Dict[str, Tuple[Optional[Task], int, Optional[str]]] = {}
+        self._next_version = 0
+        self._depth = 0
+        # Replication outbox: entry ID -> [task ID, attempts, next attempt (epoch), last error]
+        self.outbox: "OrderedDict[int, List]" = OrderedDict()
+        self._outbox_seq = 0
+        self._staged_outbox: List[str] = []
+
+    # Reads
+
+    def get(self, task_id: str) -> Optional[Task]:
+        """Get a task by ID, falling back to the archive for tasks no longer in the hot set"""
+        self.refresh()
+        task = self.tasks.get(task_id)
+        if task is None and self.archive is not None:
+            task = self.archive.get(task_id)
+        return task
+
+    def list(self, status: Optional[str] = None) -> List[Task]:
+        """Get all tasks, optionally only those with the given status"""
+        self.refresh()
+        if status is None:
+            return list(self.tasks.values())
+        code = STATUS.lookup(status)
+        if code is None:
+            return []
+        return [self.tasks[task_id] for task_id in self.status_index.ids(code)]
+
+    def query(
+        self,
+        statuses: Optional[Collection[str]] = None,
+        priorities: Optional[Collection[str]] = None,
+        updated_after: Optional[float] = None,
+        updated_before: Optional[float] = None,
+        cursor: Optional[Tuple[float, str]] = None,
+        limit: int = 100,
+    ) -> Tuple[List[Task], Optional[Tuple[float, str]]]:
+        """Get one page of tasks ordered by updated_at, newest first
+
+        Returns the page and the key to pass as cursor for the next page (None on the last page).
+        updated_after is inclusive and updated_before exclusive.
+        """
+        with self.lock:
+            self.refresh()
+
+            if statuses:
+                statuses = {STATUS.lookup(status) for status in statuses}
+            if priorities:
+                priorities = {PRIORITY.lookup(priority) for priority in priorities}
+
+            upper = cursor
+            if updated_before is not None and (upper is None or (updated_before, "") < upper):
+                upper = (updated_before, "")
+
+            selected = sum(len(self.status_index.ids(status)) for status in statuses) if statuses else None
+            if selected is not None and selected * SELECTIVE_FILTER_RATIO < len(self.tasks):
+                keys = sorted(
+                    self.updated_index.key_of[task_id]
+                    for status in statuses
+                    for task_id in self.status_index.ids(status)
+                )
+                candidates = reversed([key for key in keys if upper is None or key < upper])
+            else:
+                candidates = self.updated_index.iter_desc(upper)
+
+            page = []
+            for updated_at, task_id in candidates:
+                if updated_after is not None and updated_at < updated_after:
+                    break
+                task = self.tasks[task_id]
+                if statuses and task.status not in statuses:
+                    continue
+                if priorities and task.priority not in priorities:
+                    continue
+                page.append(task)
+                if len(page) == limit:
+                    return page, (updated_at, task_id)
+
+            return page, None
+
+    def changes(self, since: int) -> Optional[Tuple[List[Task], List[Dict]]]:
+        """Get tasks created or updated after a store version, plus tombstones for deleted ones
+
+        Returns None when the gap cannot be bridged (a tombstone the client never saw has
+        been purged, or the version is from the future) and the client must resync fully.
+        The cost is proportional to the number of changes, not to the number of tasks.
+        """
+        with self.lock:
+            self.refresh()
+            if since < self.purged_version or since > self.version:
+                return None
+
+            updated, deleted = [], []
+            for task_id in reversed(self.change_log):
+                version = self.change_log[task_id]
+                if version <= since:
+                    break
+                if task_id in self.tombstones:
+                    deleted.append({
+                        "id": task_id,
+                        "version": version,
+                        "deleted_at": self.tombstones[task_id][1],
+                        "archived": self.archive is not None and task_id in self.archive
+                    })
+                else:
+                    updated.append(self.tasks[task_id])
+
+            updated.reverse()
+            deleted.reverse()
+            return updated, deleted
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[Task, float, bool]]:
+        """Full-text search over hot and archived tasks
+
+        Returns (task, BM25 score, archived) tuples, best match first.
+        """
+        self.build_search_index()
+        with self.lock:
+            self.refresh()
+            if self.search_index is None:
+                # The cache was reloaded since the build
+                return []
+
+            results = []
+            for task_id, score in self.search_index.search(query, limit):
+                task = self.tasks.get(task_id)
+                if task is not None:
+                    results.append((task, score, False))
+                elif self.archive is not None:
+                    task = self.archive.get(task_id)
+                    if task is not None:
+                        results.append((task, score, True))
+            return results
+
+    def build_search_index(self):
+        """Build the search index if it is not built yet, without blocking other store calls
+
+        Tasks are snapshotted under the lock and indexed outside it; the changes committed
+        in the meantime are then caught up from the change log, under the lock again.
+        """
+        with self._search_build_lock:
+            with self.lock:
+                self.refresh()
+                if self.search_index is not None:
+                    return
+                tasks = list(self.tasks.values())
+                version, generation = self.version, self._generation
+
+            index = TaskSearchIndex()
+            if self.archive is not None:
+                index.add_all(self.archive.iter_tasks())
+            index.add_all(tasks)
+
+            with self.lock:
+                if generation != self._generation:
+                    return
+                for task_id in reversed(self.change_log):
+                    if self.change_log[task_id] <= version:
+                        break
+                    task = self.tasks.get(task_id)
+                    if task is not None:
+                        index.add(task)
+                    elif self.archive is None or task_id not in self.archive:
+                        index.remove(task_id)
+                    elif task_id not in index:
+                        archived = self.archive.get(task_id)
+                        if archived is not None:
+                            index.add(archived)
+                self.search_index = index
+
+    def current_version(self) -> int:
+        """Get the store version after picking up changes from other processes"""
+        self.refresh()
+        return self.version
+
+    def count_by_status(self) -> Dict[str, int]:
+        """Get the number of tasks per status"""
+        self.refresh()
+        return {STATUS.name(code): count for code, count in self.status_index.counts().items()}
+
+    def refresh(self):
+        """Pick up changes made by other processes (no-op for the in-memory backend)"""
+        pass
+
+    # Writes
+
+    @contextmanager
+    def transaction(self):
+        """Group several writes into one atomic unit; nested calls join the outer transaction"""
+        with self.lock:
+            if self._depth == 0:
+                self._begin()
+                self._next_version = self.version
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._staged = {}
+                    self._staged_outbox = []
+                    self._rollback()
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                staged, self._staged = self._staged, {}
+                staged_outbox, self._staged_outbox = self._staged_outbox, []
+                cutoff = self._purge_cutoff()
+                if cutoff is not None:
+                    self._write_purge(cutoff)
+                self._commit(self._next_version)
+                self._apply_outbox(staged_outbox)
+                # Staged entries are kept in version order, which the change log relies on
+                for task_id, (task, version, deleted_at) in staged.items():
+                    self._apply(task_id, task, version, deleted_at)
+                self.version = self._next_version
+                if cutoff is not None:
+                    self._purge_tombstones(cutoff)
+
+    def create(self, task: Task) -> Task:
+        """Insert a new task"""
+        with self.transaction():
+            self._stage(task.id, task)
+        return task
+
+    def update(self, task_id: str, fields: Dict) -> Optional[Task]:
+        """Apply a partial update (JSON-shaped fields) to a task, returning the new record or None"""
+        with self.transaction():
+            current = self._current(task_id)
+            if current is None:
+                return None
+            task = current.updated(fields)
+            self._stage(task_id, task)
+        return task
+
+    def delete(self, task_id: str) -> Optional[Task]:
+        """Remove a task, returning the deleted task or None if it does not exist"""
+        with self.transaction():
+            current = self._current(task_id)
+            if current is None:
+                return None
+            self._stage(task_id, None)
+        return current
+
+    def claim_next(self) -> Optional[Task]:
+        """Move the most urgent pending task to in_progress and return it"""
+        with self.transaction():
+            task_id = self.pending_queue.peek()
+            if task_id is None:
+                return None
+            return self.update(task_id, {"status": "in_progress"})
+
+    def archive_terminal(self, older_than: float, limit: int = ARCHIVE_BATCH_SIZE) -> List[str]:
+        """Move completed/failed tasks not updated for older_than seconds to the archive
+
+        Archived tasks leave the hot set through the same path as deletions, so other
+        processes and delta-sync clients drop them too. Returns the archived IDs.
+        """
+        if self.archive is None:
+            return []
+        cutoff = time.time() - older_than
+        with self.lock:
+            self.refresh()
+            expired = []
+            for _, task_id in self.updated_index.iter_asc(cutoff):
+                task = self.tasks.get(task_id)
+                if task is not None and task.status in TERMINAL_STATUSES and task.updated_at < cutoff:
+                    expired.append(task)
+                    if len(expired) == limit:
+                        break
+        if not expired:
+            return []
+
+        # Compressed and synced without holding the store, which stays free for other calls.
+        # Written before the rows go, so a crash leaves a task in both tiers, never neither
+        self.archive.append(expired)
+
+        archived = []
+        with self.transaction():
+            for task in expired:
+                current = self._current(task.id)
+                # Changed meanwhile (reopened, say): it stays hot, and its archived copy is
+                # superseded whenever it is archived again
+                if current is not None and current.updated_at == task.updated_at and current.status == task.status:
+                    self._stage(task.id, None)
+                    archived.append(task.id)
+        return archived
+
+    # Replication outbox
+
+    def enqueue_replication(self, task_id: str):
+        """Record that a task must be copied to Archon, atomically with the surrounding transaction"""
+        with self.transaction():
+            self._staged_outbox.append(task_id)
+            self._write_outbox(task_id, time.time())
+
+    def claim_replications(self, limit: int, lease: float) -> List[Tuple[int, str, int]]:
+        """Take up to limit due outbox entries, hidden from other workers for lease seconds
+
+        Returns (entry ID, task ID, attempts so far). An entry whose worker dies before
+        finishing or retrying it becomes due again when the lease runs out.
+        """
+        now = time.time()
+        with self.lock:
+            claimed = []
+            for entry_id, entry in self.outbox.items():
+                if len(claimed) == limit:
+                    break
+                if entry[2] <= now:
+                    entry[2] = now + lease
+                    claimed.append((entry_id, entry[0], entry[1]))
+            return claimed
+
+    def finish_replication(self, entry_id: int):
+        """Drop an outbox entry that has been delivered (or given up on)"""
+        with self.lock:
+            self.outbox.pop(entry_id, None)
+
+    def retry_replication(self, entry_id: int, delay: float, error: Optional[str] = None, attempted: bool = True):
+        """Make an entry due again after delay seconds, counting the attempt unless attempted is False"""
+        with self.lock:
+            entry = self.outbox.get(entry_id)
+            if entry is not None:
+                entry[1] += int(attempted)
+                entry[2] = time.time() + delay
+                entry[3] = error
+
+    def replication_backlog(self) -> int:
+        """Outbox entries not yet delivered"""
+        return len(self.outbox)
+
+    def close(self):
+        """Release backend resources"""
+        pass
+
+    # Internals
+
+    def _current(self, task_id: str) -> Optional[Task]:
+        if task_id in self._staged:
+            return self._staged[task_id][0]
+        return self.tasks.get(task_id)
+
+    def _stage(self, task_id: str, task: Optional[Task]):
+        self._next_version += 1
+        deleted_at = datetime.now().isoformat() if task is None else None
+        self._staged.pop(task_id, None)
+        self._staged[task_id] = (task, self._next_version, deleted_at)
+        self._write(task_id, task, self._next_version, deleted_at)
+
+    def _apply(self, task_id: str, task: Optional[Task], version: int, deleted_at: Optional[str] = None):
+        """Make a committed change visible in the in-process cache and indexes"""
+        self.change_log[task_id] = version
+        self.change_log.move_to_end(task_id)
+
+        if task is None:
+            self.tombstones[task_id] = (version, deleted_at)
+            self.tombstones.move_to_end(task_id)
+            self.tasks.pop(task_id, None)
+            self.status_index.update(task_id, None)
+            self.updated_index.update(task_id, None)
+            self.pending_queue.discard(task_id)
+            # Archived tasks stay searchable
+            if self.search_index is not None and task_id in self.search_index:
+                if self.archive is None or task_id not in self.archive:
+                    self.search_index.remove(task_id)
+            return
+
+        self.tombstones.pop(task_id, None)
+        self.tasks[task_id] = task
+        if self.search_index is not None:
+            self.search_index.add(task)
+        self.status_index.update(task_id, task.status)
+        self.updated_index.update(task_id, task.updated_at)
+        if task.status == PENDING:
+            self.pending_queue.push(task)
+        else:
+            self.pending_queue.discard(task_id)
+
+    def _clear(self):
+        self.tasks = {}
+        self.status_index.clear()
+        self.updated_index.clear()
+        self.pending_queue.clear()
+        self.change_log.clear()
+        self.tombstones.clear()
+        # Rebuilt from the reloaded tasks on the next search
+        self.search_index = None
+        self._generation += 1
+
+    def _purge_cutoff(self) -> Optional[str]:
+        """Get the deleted_at cutoff for expired tombstones, or None if a sweep is not due"""
+        now = time.time()
+        if now - self._last_purge < TOMBSTONE_PURGE_INTERVAL:
+            return None
+        self._last_purge = now
+        return (datetime.now() - timedelta(seconds=self.tombstone_retention)).isoformat()
+
+    def _purge_tombstones(self, cutoff: str):
+        """Drop cached tombstones deleted before the cutoff"""
+        while self.tombstones:
+            task_id, (version, deleted_at) = next(iter(self.tombstones.items()))
+            if deleted_at >= cutoff:
+                break
+            del self.tombstones[task_id]
+            if self.change_log.get(task_id) == version:
+                del self.change_log[task_id]
+            self.purged_version = max(self.purged_version, version)
+
+    def _begin(self):
+        pass
+
+    def _write(self, task_id: str, task: Optional[Task], version: int, deleted_at: Optional[str] = None):
+        pass
+
+    def _write_purge(self, cutoff: str):
+        pass
+
+    def _commit(self, version: int):
+        pass
+
+    def _rollback(self):
+        pass
+
+    def _write_outbox(self, task_id: str, due_at: float):
+        pass
+
+    def _apply_outbox(self, task_ids: List[str]):
+        """Make committed outbox entries visible"""
+        now = time.time()
+        for task_id in task_ids:
+            self._outbox_seq += 1
+            self.outbox[self._outbox_seq] = [task_id, 0, now, None]
+
+
+class SQLiteTaskStore(InMemoryTaskStore):
+    """Durable task repository backed by SQLite in WAL mode with a hot in-process read cache
+
+    Every API worker keeps the full task set in memory and only goes to disk for writes.
+    Reads check SQLite's data_version first, which is a cheap way to learn whether
+    another connection has committed since we last looked.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        aging_interval: float = DEFAULT_AGING_INTERVAL,
+        tombstone_retention: float = DEFAULT_TOMBSTONE_RETENTION,
+        archive: Optional[TaskArchive] = None,
+    ):
+        super().__init__(aging_interval, tombstone_retention, archive)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.executescript(SQLITE_SCHEMA)
+        self.epoch = str(self.conn.execute("SELECT value FROM store_meta WHERE key = 'epoch'").fetchone()[0])
+        self._data_version: Optional[int] = None
+        self.refresh()
+        logger.info(f"SQLite task store opened at {db_path} with {len(self.tasks)} tasks")
+
+    def refresh(self):
+        """Reload the cache if another connection has committed since the last read"""
+        with self.lock:
+            if self._depth:
+                return
+            self._sync()
+
+    def claim_replications(self, limit: int, lease: float) -> List[Tuple[int, str, int]]:
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                claimed = self.conn.execute(
+                    "SELECT id, task_id, attempts FROM task_outbox WHERE next_attempt_at <= ? "
+                    "ORDER BY next_attempt_at LIMIT ?",
+                    (now, limit),
+                ).fetchall()
+                self.conn.executemany(
+                    "UPDATE task_outbox SET next_attempt_at = ? WHERE id = ?",
+                    [(now + lease, entry_id) for entry_id, _, _ in claimed],
+                )
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+        return claimed
+
+    def finish_replication(self, entry_id: int):
+        with self.lock:
+            self.conn.execute("DELETE FROM task_outbox WHERE id = ?", (entry_id,))
+
+    def retry_replication(self, entry_id: int, delay: float, error: Optional[str] = None, attempted: bool = True):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE task_outbox SET attempts = attempts + ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                (int(attempted), time.time() + delay, error, entry_id),
+            )
+
+    def replication_backlog(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM task_outbox").fetchone()[0]
+
+    def close(self):
+        """Close the database connection"""
+        with self.lock:
+            self.conn.close()
+
+    def _sync(self):
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return
+        self._data_version = data_version
+
+        meta = dict(self.conn.execute("SELECT key, value FROM store_meta"))
+        if meta["version"] == self.version:
+            return
+
+        if self.version < meta["purged_version"]:
+            # Tombstones we never saw are gone, so only a full reload is safe
+            self._clear()
+            self.version = 0
+        self._load_since(self.version)
+        self.version = meta["version"]
+        self.purged_version = max(self.purged_version, meta["purged_version"])
+
+    def _load_since(self, since: int):
+        """Apply every task row and tombstone written after the given version, in version order"""
+        changes = [
+            (version, task_id, Task.from_dict(json.loads(data)), None)
+            for task_id, data, version in self.conn.execute(
+                "SELECT id, data, version FROM tasks WHERE version > ?", (since,)
+            )
+        ]
+        changes.extend(
+            (version, task_id, None, deleted_at)
+            for task_id, version, deleted_at in self.conn.execute(
+                "SELECT id, version, deleted_at FROM task_tombstones WHERE version > ?", (since,)
+            )
+        )
+        changes.sort(key=lambda change: change[0])
+        for version, task_id, task, deleted_at in changes:
+            self._apply(task_id, task, version, deleted_at)
+
+    def _begin(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        # We hold the write lock now, so the cache can be brought fully up to date
+        self._sync()
+
+    def _write(self, task_id: str, task: Optional[Task], version: int, deleted_at: Optional[str] = None):
+        if task is None:
+            self.conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO task_tombstones (id, version, deleted_at) VALUES (?, ?, ?)",
+                (task_id, version, deleted_at),
+            )
+            return
+        self.conn.execute(
+            "INSERT OR REPLACE INTO tasks (id, status, priority, created_at, updated_at, version, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                task_id,
+                task.status_name,
+                task.priority_name,
+                to_iso(task.created_at),
+                to_iso(task.updated_at),
+                version,
+                json.dumps(serialize_task(task)),
+            ),
+        )
+
+    def _write_purge(self, cutoff: str):
+        expired = self.conn.execute(
+            "SELECT MAX(version) FROM task_tombstones WHERE deleted_at < ?", (cutoff,)
+        ).fetchone()[0]
+        if expired is None:
+            return
+        self.conn.execute("DELETE FROM task_tombstones WHERE deleted_at < ?", (cutoff,))
+        self.conn.execute(
+            "UPDATE store_meta SET value = MAX(value, ?) WHERE key = 'purged_version'", (expired,)
+        )
+
+    def _commit(self, version: int):
+        self.conn.execute("UPDATE store_meta SET value = ? WHERE key = 'version'", (version,))
+        self.conn.execute("COMMIT")
+
+    def _rollback(self):
+        self.conn.execute("ROLLBACK")
+
+    def _write_outbox(self, task_id: str, due_at: float):
+        self.conn.execute("INSERT INTO task_outbox (task_id, next_attempt_at) VALUES (?, ?)", (task_id, due_at))
+
+    def _apply_outbox(self, task_ids: List[str]):
+        # The rows committed with the transaction; workers read them from the database
+        pass
+
+
+def create_task_store(backend: Optional[str] = None, db_path: Optional[str] = None) -> InMemoryTaskStore:
+    """Create the task store configured by TASK_STORE_BACKEND (sqlite or memory)
+
+    TASK_ARCHIVE_DIR enables the archive for finished tasks (empty disables it) and
+    TASK_ARCHIVE_COMPRESSION picks its codec (zlib or lzma).
+    """
+    backend = backend or os.getenv("TASK_STORE_BACKEND", "sqlite")
+    aging_interval = float(os.getenv("TASK_AGING_INTERVAL", DEFAULT_AGING_INTERVAL))
+    tombstone_retention = float(os.getenv("TASK_TOMBSTONE_RETENTION", DEFAULT_TOMBSTONE_RETENTION))
+    archive_dir = os.getenv("TASK_ARCHIVE_DIR", "task_archive")
+    archive = TaskArchive(archive_dir, os.getenv("TASK_ARCHIVE_COMPRESSION", "zlib")) if archive_dir else None
+
+    if backend == "memory":
+        return InMemoryTaskStore(aging_interval, tombstone_retention, archive)
+    if backend == "sqlite":
+        db_path = db_path or os.getenv("TASK_STORE_PATH", "tasks.db")
+        return SQLiteTaskStore(db_path, aging_interval, tombstone_retention, archive)
+
+    raise ValueError(f"Unknown task store backend: {backend}")
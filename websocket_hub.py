@@ -0,0 +1,493 @@
+"""
+WebSocket fan-out for the Claude Code Automation API
+Every client has a bounded queue of outgoing frames drained by its own writer task, so a
+broadcast is one enqueue per client and a slow browser only ever delays itself; events
+are first gathered over a short window so bursts go out as one frame, and clients that
+subscribed to topics only get the events matching them. Events carry sequence numbers
+and the latest ones are kept, so a reconnecting client is sent only what it missed
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import uuid
+from collections import OrderedDict, deque
+from typing import Callable, Collection, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import WebSocket
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+# Frames queued per client before the overflow policy kicks in (WS_SEND_QUEUE_SIZE)
+DEFAULT_SEND_QUEUE_SIZE = 256
+# Seconds one send may take before the client is considered dead (WS_SEND_TIMEOUT)
+DEFAULT_SEND_TIMEOUT = 10.0
+
+# What to do when a client's queue is full (WS_OVERFLOW_POLICY):
+#   drop_oldest - discard the oldest queued frame
+#   coalesce    - a keyed frame (e.g. the latest state of one task) replaces its queued
+#                 predecessor in place; when the queue is still full the oldest frame goes
+#   disconnect  - close the connection; the browser reconnects and resyncs
+# disconnect is the default because the client always learns it missed something.
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+DEFAULT_OVERFLOW_POLICY = "disconnect"
+
+# Seconds events are gathered before going out together (WS_COALESCE_WINDOW, 0 sends each at once)
+DEFAULT_COALESCE_WINDOW = 0.05
+
+# Topics a client may subscribe to: "status" (automation status feed), or a prefix plus a value:
+# "task:<task id>", "type:<event type>", "conversation:<conversation id>"
+TOPIC_PREFIXES = ("task:", "type:", "conversation:")
+STATUS_TOPIC = "status"
+# Topics one client may hold (WS_MAX_TOPICS)
+DEFAULT_MAX_TOPICS = 100
+# Sent events kept for reconnecting clients (WS_REPLAY_SIZE)
+DEFAULT_REPLAY_SIZE = 1000
+
+
+def valid_topic(topic) -> bool:
+    if not isinstance(topic, str) or len(topic) > 200:
+        return False
+    return topic == STATUS_TOPIC or any(topic.startswith(prefix) and len(topic) > len(prefix) for prefix in TOPIC_PREFIXES)
+
+
+class QueuedFrame:
+    __slots__ = ("frame", "key")
+
+    def __init__(self, frame: str, key: Optional[str]):
+        self.frame = frame
+        self.key = key
+
+
+class ClientConnection:
+    """One connected client: its socket, its outbound queue and the writer task draining it"""
+
+    def __init__(self, hub: "WebSocketHub", websocket: WebSocket):
+        self.hub = hub
+        self.websocket = websocket
+        self.queue: Deque[QueuedFrame] = deque()
+        # Coalescing key -> the queued frame carrying it
+        self.keyed: Dict[str, QueuedFrame] = {}
+        self.ready = asyncio.Event()
+        # Subscribed topics; none means the client gets every event
+        self.topics: Set[str] = set()
+        self.closed = False
+        self.dropped = 0
+        self.writer: Optional[asyncio.Task] = None
+
+    def enqueue(self, frame: str, key: Optional[str] = None):
+        """Queue an encoded frame without waiting; applies the overflow policy when full"""
+        if self.closed:
+            return
+        hub = self.hub
+
+        if key is not None and hub.overflow_policy == "coalesce":
+            queued = self.keyed.get(key)
+            if queued is not None:
+                queued.frame = frame
+                hub.coalesced += 1
+                return
+
+        if len(self.queue) >= hub.max_queue:
+            if hub.overflow_policy == "disconnect":
+                logger.warning("Disconnecting slow WebSocket client (send queue full)")
+                hub.slow_disconnects += 1
+                self.close()
+                return
+            oldest = self.queue.popleft()
+            if oldest.key is not None and self.keyed.get(oldest.key) is oldest:
+                del self.keyed[oldest.key]
+            self.dropped += 1
+            hub.dropped += 1
+
+        queued = QueuedFrame(frame, key)
+        self.queue.append(queued)
+        if key is not None and hub.overflow_policy == "coalesce":
+            self.keyed[key] = queued
+        self.ready.set()
+
+    def wants(self, topics: Iterable[str]) -> bool:
+        """Whether an event with these topics is for this client"""
+        return not self.topics or not self.topics.isdisjoint(topics)
+
+    async def run_writer(self):
+        """Send queued frames in order until the client goes away"""
+        try:
+            while True:
+                while not self.queue:
+                    self.ready.clear()
+                    await self.ready.wait()
+                queued = self.queue.popleft()
+                if queued.key is not None and self.keyed.get(queued.key) is queued:
+                    del self.keyed[queued.key]
+                await asyncio.wait_for(self.websocket.send_text(queued.frame), self.hub.send_timeout)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.info(f"WebSocket client dropped: {e.__class__.__name__}")
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop sending and close the socket (safe to call more than once)"""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.clear()
+        self.keyed.clear()
+        self.hub.unregister(self)
+        if self.writer is not None and self.writer is not asyncio.current_task():
+            self.writer.cancel()
+        # The endpoint's receive loop ends once the socket is closed
+        asyncio.ensure_future(self._close_socket())
+
+    async def _close_socket(self):
+        try:
+            await self.websocket.close()
+        except Exception:
+            pass
+
+
+class WebSocketHub:
+    """Registry of connected clients with non-blocking broadcast"""
+
+    def __init__(
+        self,
+        max_queue: int = DEFAULT_SEND_QUEUE_SIZE,
+        overflow_policy: str = DEFAULT_OVERFLOW_POLICY,
+        send_timeout: float = DEFAULT_SEND_TIMEOUT,
+        max_topics: int = DEFAULT_MAX_TOPICS,
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown WebSocket overflow policy: {overflow_policy}")
+        self.max_queue = max_queue
+        self.overflow_policy = overflow_policy
+        self.send_timeout = send_timeout
+        self.max_topics = max_topics
+        self.clients: Set[ClientConnection] = set()
+        # Clients without subscriptions, which get everything
+        self.unfiltered: Set[ClientConnection] = set()
+        # Topic -> clients subscribed to it
+        self.index: Dict[str, Set[ClientConnection]] = {}
+        self.dropped = 0
+        self.coalesced = 0
+        self.slow_disconnects = 0
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+    def register(self, websocket: WebSocket) -> ClientConnection:
+        """Add an accepted socket and start its writer task"""
+        client = ClientConnection(self, websocket)
+        self.clients.add(client)
+        self.unfiltered.add(client)
+        client.writer = asyncio.create_task(client.run_writer())
+        return client
+
+    def unregister(self, client: ClientConnection):
+        self.clients.discard(client)
+        self.unfiltered.discard(client)
+        self._unindex(client, client.topics)
+
+    def subscribe(self, client: ClientConnection, topics: Iterable[str]) -> Set[str]:
+        """Narrow a client to (additional) topics; returns its topics
+
+        Raises ValueError for malformed topics or more than max_topics in total.
+        """
+        topics = set(topics)
+        invalid = [topic for topic in topics if not valid_topic(topic)]
+        if invalid:
+            raise ValueError(f"Invalid topic(s): {', '.join(map(str, invalid[:5]))}")
+        if len(client.topics | topics) > self.max_topics:
+            raise ValueError(f"At most {self.max_topics} topics per connection")
+        if client.closed or not topics:
+            return client.topics
+        for topic in topics - client.topics:
+            self.index.setdefault(topic, set()).add(client)
+        client.topics |= topics
+        self.unfiltered.discard(client)
+        return client.topics
+
+    def unsubscribe(self, client: ClientConnection, topics: Optional[Iterable[str]] = None) -> Set[str]:
+        """Drop topics (all of them if None); a client left without topics gets everything again"""
+        topics = set(client.topics) if topics is None else set(topics) & client.topics
+        self._unindex(client, topics)
+        client.topics -= topics
+        if not client.topics and not client.closed:
+            self.unfiltered.add(client)
+        return client.topics
+
+    def subscribers(self, topics: Iterable[str]) -> Set[ClientConnection]:
+        """Subscribed clients watching any of topics (clients without subscriptions not included)"""
+        matched: Set[ClientConnection] = set()
+        for topic in topics:
+            clients = self.index.get(topic)
+            if clients:
+                matched |= clients
+        return matched
+
+    def recipients(self, topics: Optional[Iterable[str]]) -> Set[ClientConnection]:
+        """Clients an event with these topics goes to (everyone if topics is None)"""
+        if topics is None:
+            return set(self.clients)
+        return self.unfiltered | self.subscribers(topics)
+
+    def broadcast(self, frame: str, key: Optional[str] = None, topics: Optional[Iterable[str]] = None):
+        """Queue an encoded frame for every client watching one of topics (every client if None)
+
+        Never waits on a client.
+        """
+        # A copy, because the disconnect policy may unregister clients while we iterate
+        for client in self.recipients(topics):
+            client.enqueue(frame, key)
+
+    def stats(self) -> Dict:
+        return {
+            "clients": len(self.clients),
+            "subscribed_clients": len(self.clients) - len(self.unfiltered),
+            "topics": len(self.index),
+            "queued_frames": sum(len(client.queue) for client in self.clients),
+            "max_queue": self.max_queue,
+            "overflow_policy": self.overflow_policy,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "slow_disconnects": self.slow_disconnects,
+        }
+
+    def _unindex(self, client: ClientConnection, topics: Iterable[str]):
+        for topic in topics:
+            clients = self.index.get(topic)
+            if clients is not None:
+                clients.discard(client)
+                if not clients:
+                    del self.index[topic]
+
+
+class ReplayBuffer:
+    """Ring of the latest sent events, for clients resuming after a disconnect
+
+    Sequence numbers only mean something within one stream: a restarted server starts a
+    new stream ID, so clients that come back with the old one resynchronize.
+    """
+
+    def __init__(self, size: int = DEFAULT_REPLAY_SIZE):
+        self.stream_id = uuid.uuid4().hex
+        self.events: Deque[Dict] = deque(maxlen=size)
+        # Seq of the latest event sent, and of the latest one that fell out of the ring
+        self.last_seq = 0
+        self.evicted_seq = 0
+
+    def append(self, events: List[Dict]):
+        for event in events:
+            if len(self.events) == self.events.maxlen:
+                self.evicted_seq = self.events[0]["seq"]
+            self.events.append(event)
+            self.last_seq = event["seq"]
+
+    def since(self, stream_id: Optional[str], last_seq: int) -> Optional[List[Dict]]:
+        """Events sent after last_seq, or None if some of them are no longer kept"""
+        if stream_id != self.stream_id or not self.evicted_seq <= last_seq <= self.last_seq:
+            return None
+        if last_seq == self.last_seq:
+            return []
+        # Seqs increase along the ring, so only its tail is scanned
+        missed = []
+        for event in reversed(self.events):
+            if event["seq"] <= last_seq:
+                break
+            missed.append(event)
+        missed.reverse()
+        return missed
+
+
+class EventCoalescer:
+    """Gathers events for a short window and broadcasts them as one frame
+
+    The first event of a window starts the timer. Within the window a keyed event (the
+    full state of one task, or of the automation) replaces the pending one with the same
+    key and moves to its place in the order, so clients only see the latest state;
+    unkeyed events are all kept, in order. A window holding one event sends it as is,
+    otherwise the frame is {"type": "batch", "data": [event, ...]}.
+
+    topics_func names the topics of an event. Clients without subscriptions get every
+    event of the window; subscribed clients only the ones matching their topics, with
+    one frame encoded per distinct selection.
+
+    Every event is stamped with a "seq", increasing but with gaps where an event was
+    superseded within its window. Sent events also go to a replay buffer (even while no
+    client is connected), which catch_up() uses for a reconnecting client. Event types
+    in unsequenced (streaming fragments a later event makes redundant) get no seq and
+    are not replayed, so a long stream cannot push everything else out of the buffer.
+    """
+
+    def __init__(
+        self,
+        hub: WebSocketHub,
+        window: float = DEFAULT_COALESCE_WINDOW,
+        key_func: Callable[[Dict], Optional[str]] = lambda message: None,
+        topics_func: Callable[[Dict], List[str]] = lambda message: [],
+        replay_size: int = DEFAULT_REPLAY_SIZE,
+        unsequenced: Collection[str] = (),
+    ):
+        self.hub = hub
+        self.window = window
+        self.key_func = key_func
+        self.topics_func = topics_func
+        self.replay = ReplayBuffer(replay_size)
+        self.unsequenced = frozenset(unsequenced)
+        self.seq = 0
+        # Coalescing key (or a unique number for unkeyed events) -> pending event
+        self.pending: "OrderedDict[object, Dict]" = OrderedDict()
+        self._unkeyed = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.events = 0
+        self.merged = 0
+        self.frames = 0
+        self.resumed = 0
+        self.resyncs = 0
+
+    def publish(self, message: Dict):
+        """Queue an event for the current window; never waits
+
+        Events are encoded when the window closes, so a message must not be changed
+        afterwards unless its latest state is what clients should get. Adds "seq" to it
+        (unless its type is unsequenced).
+        """
+        self.events += 1
+        if message["type"] not in self.unsequenced:
+            self.seq += 1
+            message["seq"] = self.seq
+        if self.window <= 0:
+            self._send([message])
+            return
+
+        key = self.key_func(message)
+        if key is None:
+            key = next(self._unkeyed)
+        elif self.pending.pop(key, None) is not None:
+            self.merged += 1
+        self.pending[key] = message
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+
+    def flush(self):
+        """Send everything pending now"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        events = list(self.pending.values())
+        self.pending.clear()
+        if events:
+            self._send(events)
+
+    def catch_up(self, client: ClientConnection, stream_id: Optional[str], last_seq: int) -> Optional[List[Dict]]:
+        """The events for client's topics sent after last_seq, reduced to the latest state
+
+        Returns None when the gap reaches past the replay buffer (or the stream is not
+        this one), in which case the client has to resynchronize.
+        """
+        missed = self.replay.since(stream_id, last_seq)
+        if missed is None:
+            self.resyncs += 1
+            return None
+        self.resumed += 1
+
+        # As within a window, a keyed event only matters in its latest state
+        selected: "OrderedDict[object, Dict]" = OrderedDict()
+        for i, event in enumerate(missed):
+            if client.wants(self.topics_func(event)):
+                key = self.key_func(event)
+                if key is None:
+                    key = i
+                else:
+                    selected.pop(key, None)
+                selected[key] = event
+        return list(selected.values())
+
+    def send_to(self, client: ClientConnection, events: List[Dict]):
+        """Queue events for one client, as one frame"""
+        if events:
+            frame, key = self._encode(events)
+            client.enqueue(frame, key)
+
+    def stats(self) -> Dict:
+        return {
+            "window_ms": round(self.window * 1000, 1),
+            "events": self.events,
+            "merged": self.merged,
+            "frames": self.frames,
+            "pending": len(self.pending),
+            "seq": self.seq,
+            "replay_buffered": len(self.replay.events),
+            "resumed": self.resumed,
+            "resyncs": self.resyncs,
+        }
+
+    def _send(self, events: List[Dict]):
+        self.replay.append([event for event in events if event["type"] not in self.unsequenced])
+        hub = self.hub
+        if not hub.clients:
+            return
+        if len(events) == 1:
+            clients = hub.recipients(self.topics_func(events[0]))
+            if clients:
+                # Encode once and reuse the same frame for every client
+                self.frames += 1
+                frame, key = self._encode(events)
+                for client in clients:
+                    client.enqueue(frame, key)
+            return
+
+        # Which of the events each subscribed client gets, grouped so that clients
+        # with the same selection share one encoded frame
+        selected: Dict[ClientConnection, List[int]] = {}
+        for i, event in enumerate(events):
+            for client in hub.subscribers(self.topics_func(event)):
+                selected.setdefault(client, []).append(i)
+        groups: Dict[Tuple[int, ...], List[ClientConnection]] = {}
+        for client, indexes in selected.items():
+            groups.setdefault(tuple(indexes), []).append(client)
+        if hub.unfiltered:
+            groups.setdefault(tuple(range(len(events))), []).extend(hub.unfiltered)
+
+        for indexes, clients in groups.items():
+            self.frames += 1
+            frame, key = self._encode([events[i] for i in indexes])
+            for client in clients:
+                client.enqueue(frame, key)
+
+    def _encode(self, events: List[Dict]) -> Tuple[str, Optional[str]]:
+        """Frame for the events, and its coalescing key in the client queues"""
+        if len(events) == 1:
+            return json_codec.dumps(events[0]), self.key_func(events[0])
+        return json_codec.dumps({"type": "batch", "data": events}), None
+
+
+def create_websocket_hub() -> WebSocketHub:
+    """Build the hub from WS_SEND_QUEUE_SIZE, WS_OVERFLOW_POLICY, WS_SEND_TIMEOUT and WS_MAX_TOPICS"""
+    return WebSocketHub(
+        max_queue=int(os.getenv("WS_SEND_QUEUE_SIZE", DEFAULT_SEND_QUEUE_SIZE)),
+        overflow_policy=os.getenv("WS_OVERFLOW_POLICY", DEFAULT_OVERFLOW_POLICY),
+        send_timeout=float(os.getenv("WS_SEND_TIMEOUT", DEFAULT_SEND_TIMEOUT)),
+        max_topics=int(os.getenv("WS_MAX_TOPICS", DEFAULT_MAX_TOPICS)),
+    )
+
+
+def create_event_coalescer(
+    hub: WebSocketHub,
+    key_func: Callable[[Dict], Optional[str]],
+    topics_func: Callable[[Dict], List[str]],
+    unsequenced: Collection[str] = (),
+) -> EventCoalescer:
+    """Build a coalescer in front of hub from WS_COALESCE_WINDOW and WS_REPLAY_SIZE"""
+    return EventCoalescer(
+        hub,
+        window=float(os.getenv("WS_COALESCE_WINDOW", DEFAULT_COALESCE_WINDOW)),
+        key_func=key_func,
+        topics_func=topics_func,
+        replay_size=int(os.getenv("WS_REPLAY_SIZE", DEFAULT_REPLAY_SIZE)),
+        unsequenced=unsequenced,
+    )